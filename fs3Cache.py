@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""
+
+    fs3Cache.py -- Plugin implimentation caching the loaded columns
+                -- For more information see : https://github.com/andreasfoulk/FS3
+                -- These functions are tested with cacheTests.py
+
+    Copyright (c) 2018 Orden Aitchedji, McKenna Duzac, Andreas Foulk, Tanner Lee
+
+    This software may be modified and distributed under the terms
+    of the MIT license.  See the LICENSE file for details.
+
+"""
+
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy
+
+# Default memory budget of the column cache, in bytes
+COLUMN_CACHE_BUDGET = 512 * 1024 * 1024
+
+# Number of objects measured to estimate the size of an object array
+SIZE_SAMPLE = 1000
+
+class FS3ColumnCache(object):
+    """
+    FS3ColumnCache
+    Least recently used cache of the columns read from the layers
+    and of the sorted and encoded columns built from them
+    Keys start with (layer id, limited to selection, layer filter), every
+    entry of a layer is dropped when the layer reports a change
+    Used from the GUI thread and from the refresh task
+    """
+
+    def __init__(self, budget=COLUMN_CACHE_BUDGET):
+        """
+        Variable definitions
+        @param budget Bytes the cached entries may use together
+        """
+        self.budget = budget
+        self.totalSize = 0
+        # {key:(value, size)}, least recently used first
+        self.entries = OrderedDict()
+        # {layer_id:number of invalidations}
+        self.generations = {}
+        self.lock = threading.Lock()
+
+    def generation(self, layerId):
+        """
+        generation
+        Read before loading, entries loaded before an invalidation are refused
+        @param layerId Id of the layer
+        @return Number of times the layer was invalidated
+        """
+        with self.lock:
+            return self.generations.get(layerId, 0)
+
+    def get(self, key):
+        """
+        get
+        @param key Tuple starting with (layer id, limited to selection)
+        @return Cached value, None if it is not cached
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            self.entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, value, generation=None):
+        """
+        put
+        Stores a value, the least recently used entries are evicted
+        until the cache fits in its budget again
+        @param key Tuple starting with (layer id, limited to selection)
+        @param value Value to cache
+        @param generation Layer generation read before the value was loaded
+        @return True if the value was stored
+        """
+        size = memorySize(value)
+        with self.lock:
+            if generation is not None and generation != self.generations.get(key[0], 0):
+                # The layer changed while the value was loaded
+                return False
+            self.removeEntry(key)
+            if size > self.budget:
+                return False
+            self.entries[key] = (value, size)
+            self.totalSize += size
+            while self.totalSize > self.budget:
+                self.removeEntry(next(iter(self.entries)))
+            return True
+
+    def invalidateLayer(self, layerId, limitToSelected=None):
+        """
+        invalidateLayer
+        Drops the entries of a layer
+        @param layerId Id of the layer that changed
+        @param limitToSelected True or False to only drop the entries read
+                               with or without the selection, None for all
+        """
+        with self.lock:
+            self.generations[layerId] = self.generations.get(layerId, 0) + 1
+            for key in list(self.entries):
+                if key[0] == layerId and limitToSelected in (None, key[1]):
+                    self.removeEntry(key)
+
+    def removeEntry(self, key):
+        """
+        removeEntry
+        Drops one entry, the lock must be held
+        @param key Key of the entry
+        """
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.totalSize -= entry[1]
+
+    def __len__(self):
+        return len(self.entries)
+
+def memorySize(value):
+    """
+    memorySize
+    Estimates the bytes used by a cached value from its numpy arrays and lists,
+    the objects of object arrays and lists are measured on a sample
+    @param value Numpy array or object holding numpy arrays and lists
+    @return Estimated size in bytes
+    """
+    if isinstance(value, numpy.ndarray):
+        size = value.nbytes
+        if value.dtype == object and len(value) > 0:
+            size += sampledSize(value)
+        return size
+    if isinstance(value, list):
+        return sys.getsizeof(value) + (sampledSize(value) if value else 0)
+    size = sys.getsizeof(value)
+    for attribute in getattr(value, '__dict__', {}).values():
+        if isinstance(attribute, (numpy.ndarray, list)):
+            size += memorySize(attribute)
+    return size
+
+def sampledSize(items):
+    """
+    sampledSize
+    @param items Non-empty numpy object array or list
+    @return Estimated bytes used by the objects it holds
+    """
+    step = max(1, len(items) // SIZE_SAMPLE)
+    sample = items[::step]
+    sampleSize = sum(sys.getsizeof(item) for item in sample)
+    return int(sampleSize * len(items) / float(len(sample)))
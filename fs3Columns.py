@@ -0,0 +1,359 @@
+# -*- coding: utf-8 -*-
+"""
+
+    fs3Columns.py -- Plugin implimentation handling columnar attribute data
+                  -- For more information see : https://github.com/andreasfoulk/FS3
+
+    Copyright (c) 2018 Orden Aitchedji, McKenna Duzac, Andreas Foulk, Tanner Lee
+
+    This software may be modified and distributed under the terms
+    of the MIT license.  See the LICENSE file for details.
+
+"""
+
+import copy
+import numpy
+from qgis.core import QgsFeatureRequest, NULL
+
+from .fs3Stats import toNumericArray, FS3StatisticsAccumulator
+from .fs3Unique import hashableValue
+
+# Number of features read between two progress and cancellation checks
+FEEDBACK_INTERVAL = 1000
+# Number of features converted to numpy at once while reading, bounds
+# the Python lists held on top of the typed columns
+READ_CHUNK_SIZE = 65536
+
+class FS3Column(object):
+    """
+    FS3Column
+    Values of one field as a typed numpy array with a validity mask
+    Numeric fields are int64 or float64 with 0 in the empty cells,
+    every other field is an object array with None in the empty cells,
+    where list and map values are replaced by their text
+    Numeric columns carry the FS3StatisticsAccumulator of their values
+    """
+
+    def __init__(self, field, rawValues):
+        """
+        Variable definitions
+        @param field QgsField the values belong to
+        @param rawValues List of attribute values, NULL for empty cells
+        """
+        self.name = field.name()
+        self.numeric = field.isNumeric()
+        self.valid = numpy.fromiter((value != NULL for value in rawValues),
+                                    dtype=bool, count=len(rawValues))
+        hasEmpty = not self.valid.all()
+        if self.numeric:
+            if hasEmpty:
+                rawValues = [value if filled else 0 for value, filled
+                             in zip(rawValues, self.valid.tolist())]
+            self.values = toNumericArray(rawValues)
+            filledValues = self.filledValues()
+            self.accumulator = FS3StatisticsAccumulator.fromArray(filledValues, None,
+                                                                  len(rawValues) - len(filledValues))
+        else:
+            if hasEmpty:
+                rawValues = [value if filled else None for value, filled
+                             in zip(rawValues, self.valid.tolist())]
+            try:
+                # Strings cache their hash, the check costs little
+                hash(tuple(rawValues))
+            except TypeError:
+                rawValues = [hashableValue(value) for value in rawValues]
+            self.values = numpy.empty(len(rawValues), dtype=object)
+            self.values[:] = rawValues
+            self.accumulator = None
+
+    def __len__(self):
+        return len(self.values)
+
+    @classmethod
+    def concatenate(cls, chunks):
+        """
+        concatenate
+        Joins the columns converted from consecutive chunks of features,
+        the accumulators of the chunks are merged instead of recomputed
+        @param chunks Non-empty list of FS3Column of the same field
+        @return FS3Column holding the rows of every chunk in order
+        """
+        if len(chunks) == 1:
+            return chunks[0]
+        column = copy.copy(chunks[0])
+        column.values = numpy.concatenate([chunk.values for chunk in chunks])
+        column.valid = numpy.concatenate([chunk.valid for chunk in chunks])
+        if column.accumulator is not None:
+            column.accumulator = FS3StatisticsAccumulator()
+            for chunk in chunks:
+                column.accumulator.merge(chunk.accumulator)
+        return column
+
+    def filledValues(self):
+        """
+        filledValues
+        @return Numpy array of the filled values, the column itself
+                is returned without a copy when nothing is empty
+        """
+        if self.valid.all():
+            return self.values
+        return self.values[self.valid]
+
+    def toList(self, emptyValue=NULL):
+        """
+        toList
+        @param emptyValue Value to put in the empty cells
+        @return List of the values
+        """
+        values = self.values.tolist()
+        if not self.valid.all():
+            for row in numpy.flatnonzero(~self.valid).tolist():
+                values[row] = emptyValue
+        return values
+
+class FS3ColumnSet(object):
+    """
+    FS3ColumnSet
+    Columns of the fields loaded from a layer in a single pass
+    """
+
+    def __init__(self, featureIds, columns):
+        """
+        Variable definitions
+        @param featureIds int64 numpy array of the feature id of every row
+        @param columns List of FS3Column in the order of the requested fields
+        """
+        self.featureIds = featureIds
+        self.columns = columns
+
+    def rowCount(self):
+        """
+        rowCount
+        @return Number of loaded features
+        """
+        return len(self.featureIds)
+
+    def column(self, fieldName):
+        """
+        column
+        @param fieldName Name of a loaded field
+        @return FS3Column of the field, None if it was not loaded
+        """
+        for column in self.columns:
+            if column.name == fieldName:
+                return column
+        return None
+
+def columnRequest(layer, fieldNames, limitToSelected=False):
+    """
+    columnRequest
+    Builds the request reading the given fields of a layer without
+    geometry and without converting the attributes that are not needed
+    @param layer QgsVectorLayer to read
+    @param fieldNames Names of the fields to load
+    @param limitToSelected True to read the selected features only,
+                           every feature is read when nothing is selected
+    @return (QgsFeatureRequest, list of the field indexes)
+    """
+    fields = layer.fields()
+    fieldIndexes = [fields.indexFromName(name) for name in fieldNames]
+
+    request = QgsFeatureRequest()
+    request.setFlags(QgsFeatureRequest.NoGeometry)
+    request.setSubsetOfAttributes(fieldIndexes)
+    if limitToSelected and layer.selectedFeatureCount() > 0:
+        request.setFilterFids(layer.selectedFeatureIds())
+    return request, fieldIndexes
+
+def readColumns(source, fields, fieldIndexes, request, feedback=None, expectedCount=0):
+    """
+    readColumns
+    Converts the features of a request into columns
+    Every READ_CHUNK_SIZE features are converted to numpy and added to
+    the moment statistics while the rest is still being read
+    @param source QgsVectorLayer or QgsVectorLayerFeatureSource to read,
+                  only a feature source may be read outside the GUI thread
+    @param fields QgsFields of the layer
+    @param fieldIndexes Indexes of the fields to load
+    @param request QgsFeatureRequest from columnRequest
+    @param feedback Optional QgsFeedback for progress and cancellation
+    @param expectedCount Number of features expected, used for the progress
+    @return FS3ColumnSet holding one FS3Column per field, None if canceled
+    """
+    featureIds = []
+    rawColumns = [[] for fieldIndex in fieldIndexes]
+    chunks = [[] for fieldIndex in fieldIndexes]
+    for feature in source.getFeatures(request):
+        featureIds.append(feature.id())
+        for rawValues, fieldIndex in zip(rawColumns, fieldIndexes):
+            rawValues.append(feature.attribute(fieldIndex))
+        if len(featureIds) % READ_CHUNK_SIZE == 0:
+            convertChunk(fields, fieldIndexes, rawColumns, chunks)
+        if feedback is not None and len(featureIds) % FEEDBACK_INTERVAL == 0:
+            if feedback.isCanceled():
+                return None
+            if expectedCount > 0:
+                feedback.setProgress(min(100.0, 100.0 * len(featureIds) / expectedCount))
+    if len(featureIds) % READ_CHUNK_SIZE or not featureIds:
+        convertChunk(fields, fieldIndexes, rawColumns, chunks)
+
+    columns = [FS3Column.concatenate(chunkColumns) for chunkColumns in chunks]
+    return FS3ColumnSet(numpy.array(featureIds, dtype=numpy.int64), columns)
+
+def convertChunk(fields, fieldIndexes, rawColumns, chunks):
+    """
+    convertChunk
+    Turns the raw values read since the last chunk into columns
+    @param fields QgsFields of the layer
+    @param fieldIndexes Indexes of the loaded fields
+    @param rawColumns One list of raw values per field, emptied here
+    @param chunks One list of FS3Column per field, the new chunk is appended
+    """
+    for chunkColumns, fieldIndex, rawValues in zip(chunks, fieldIndexes, rawColumns):
+        chunkColumns.append(FS3Column(fields.at(fieldIndex), rawValues))
+        del rawValues[:]
+
+class FS3EncodedColumn(object):
+    """
+    FS3EncodedColumn
+    Dictionary encoding of a text column, built once per data version
+    Every value is replaced by an int32 code into a sorted dictionary,
+    so comparing codes compares the strings and counting codes counts
+    the values. Empty cells get the code -1
+    """
+
+    def __init__(self, inputArray):
+        """
+        Variable definitions
+        @param inputArray Array of values, None in the empty cells
+        """
+        codeOf = {}
+        rawCodes = []
+        for value in inputArray:
+            try:
+                code = codeOf.get(value)
+            except TypeError:
+                value = hashableValue(value)
+                code = codeOf.get(value)
+            if code is None:
+                code = len(codeOf)
+                codeOf[value] = code
+            rawCodes.append(code)
+
+        # Sort the dictionary so the codes follow the order of the strings
+        distinct = [value for value in codeOf if value is not None]
+        try:
+            self.dictionary = sorted(distinct)
+        except TypeError:
+            self.dictionary = sorted(distinct, key=mixedSortKey)
+        sortedCode = {value: code for code, value in enumerate(self.dictionary)}
+        remap = numpy.array([sortedCode.get(value, -1) for value in codeOf],
+                            dtype=numpy.int32)
+
+        self.codes = remap[numpy.asarray(rawCodes, dtype=numpy.intp)] if rawCodes \
+                     else numpy.empty(0, dtype=numpy.int32)
+        # Codes in order of first appearance, -1 where the first NULL appeared
+        self.appearanceOrder = remap
+        self.nullCount = int(numpy.count_nonzero(self.codes < 0))
+        self.counts = numpy.bincount(self.codes[self.codes >= 0],
+                                     minlength=len(self.dictionary))
+        self.lengths = numpy.fromiter((len(str(value)) for value in self.dictionary),
+                                      dtype=numpy.int64, count=len(self.dictionary))
+        # Codes in the order the data table sorts text, built on the first sort
+        self.numericFirstCodes = None
+
+    def sortCodes(self):
+        """
+        sortCodes
+        Codes renumbered so the text that reads as a number comes first in
+        numeric order and the other text follows in dictionary order, so
+        "9" sorts before "10" as it always did in the data table
+        @return int32 numpy array of sort keys, -1 in the empty cells
+        """
+        if self.numericFirstCodes is not None:
+            return self.numericFirstCodes
+        numbers = numpy.zeros(len(self.dictionary))
+        isNumber = numpy.zeros(len(self.dictionary), dtype=bool)
+        for code, value in enumerate(self.dictionary):
+            try:
+                number = float(value)
+            except (TypeError, ValueError):
+                continue
+            if not numpy.isnan(number):
+                numbers[code] = number
+                isNumber[code] = True
+        if not isNumber.any():
+            self.numericFirstCodes = self.codes
+            return self.numericFirstCodes
+        # Stable, so the text that is not a number keeps the dictionary order
+        order = numpy.lexsort((numbers, ~isNumber))
+        rank = numpy.empty(len(order), dtype=numpy.int32)
+        rank[order] = numpy.arange(len(order), dtype=numpy.int32)
+        self.numericFirstCodes = numpy.where(self.codes >= 0, rank[self.codes],
+                                             -1).astype(numpy.int32)
+        return self.numericFirstCodes
+
+    def valueCounts(self):
+        """
+        valueCounts
+        @return Dictionary of values (None for NULL) to their occurrences,
+                in order of first appearance
+        """
+        valueCounts = {}
+        for code in self.appearanceOrder.tolist():
+            if code < 0:
+                valueCounts[None] = self.nullCount
+            else:
+                valueCounts[self.dictionary[code]] = int(self.counts[code])
+        return valueCounts
+
+    def lengthCounts(self):
+        """
+        lengthCounts
+        Histogram of the string lengths, read from the dictionary
+        @return Dictionary of lengths of the filled values to their occurrences
+        """
+        if len(self.dictionary) < 1:
+            return {}
+        histogram = numpy.bincount(self.lengths, weights=self.counts)
+        lengths = numpy.flatnonzero(histogram)
+        return dict(zip(lengths.tolist(), histogram[lengths].astype(numpy.int64).tolist()))
+
+    def distinctCount(self):
+        """
+        distinctCount
+        @return Exact number of distinct values, NULL included
+        """
+        return len(self.dictionary) + (self.nullCount > 0)
+
+def mixedSortKey(value):
+    """
+    mixedSortKey
+    Defined order for columns mixing types: numbers, then text,
+    then every other type grouped by type name and ordered by its text
+    @param value Filled cell value
+    @return Tuple comparable with the key of any other value
+    """
+    if isinstance(value, (int, float)):
+        return (0, '', value, '')
+    if isinstance(value, str):
+        return (1, '', 0, value)
+    return (2, type(value).__name__, 0, str(value))
+
+def sortOrder(keys, valid, descending=False):
+    """
+    sortOrder
+    Order of the rows on typed sort keys, computed with a single stable argsort
+    Ties keep the feature order and empty cells come last in both directions
+    @param keys Numeric numpy array of sort keys
+    @param valid Bool numpy array, False for the empty cells
+    @param descending True to put the largest key first
+    @return int64 numpy array of the rows in sorted order
+    """
+    filledRows = numpy.flatnonzero(valid)
+    filledKeys = keys[filledRows]
+    if descending:
+        filledKeys = numpy.negative(filledKeys)
+    order = filledRows[numpy.argsort(filledKeys, kind='stable')]
+    emptyRows = numpy.flatnonzero(~valid)
+    return numpy.concatenate((order, emptyRows)).astype(numpy.int64)
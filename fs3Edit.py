@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+
+    fs3Edit.py -- Plugin implimentation writing and committing the data table edits
+               -- For more information see : https://github.com/andreasfoulk/FS3
+
+    Copyright (c) 2018 Orden Aitchedji, McKenna Duzac, Andreas Foulk, Tanner Lee
+
+    This software may be modified and distributed under the terms
+    of the MIT license.  See the LICENSE file for details.
+
+"""
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal, QCoreApplication
+
+# Milliseconds without a new edit before the buffered edits are committed
+EDIT_COMMIT_DELAY = 2000
+
+class FS3EditBuffer(QObject):
+    """
+    FS3EditBuffer
+    Writes the cells edited in the data table to the layer edit buffer
+    right away, so QGIS sees the layer as modified, and commits them to
+    the data provider in a single batch, either on demand or once the
+    user stopped editing
+    """
+    editFailed = pyqtSignal(str)
+
+    def __init__(self, commitDelay=EDIT_COMMIT_DELAY, parent=None):
+        """
+        Variable definitions
+        @param commitDelay Milliseconds to wait for more edits before committing
+        """
+        super(FS3EditBuffer, self).__init__(parent)
+        self.layer = None
+        self.commitDelay = commitDelay
+        # True while edits written to the layer are not committed
+        self.pending = False
+        self.commitTimer = QTimer()
+        self.commitTimer.setSingleShot(True)
+        self.commitTimer.timeout.connect(self.commit)
+
+    def setLayer(self, layer):
+        """
+        setLayer
+        Commits the edits of the previous layer before following another one
+        @param layer QgsVectorLayer the next edits belong to, None for no layer
+        """
+        if layer is self.layer:
+            return
+        self.commit()
+        self.layer = layer
+
+    def addChange(self, fid, fieldIndex, value):
+        """
+        addChange
+        Writes the new value of a cell to the layer edit buffer as one
+        undo command, the commit waits for more edits
+        @param fid Id of the edited feature
+        @param fieldIndex Index of the edited field
+        @param value New value
+        @return True if the feature was changed
+        """
+        if self.layer is None or not self.layer.isEditable():
+            self.editFailed.emit(QCoreApplication.translate("FS3EditBuffer", "Attribute update failed"))
+            return False
+        self.layer.beginEditCommand(QCoreApplication.translate("FS3EditBuffer", "FS3 attribute edits"))
+        if not self.layer.changeAttributeValues(fid, {fieldIndex: value}):
+            self.layer.destroyEditCommand()
+            self.editFailed.emit(QCoreApplication.translate("FS3EditBuffer", "Attribute update failed"))
+            return False
+        self.layer.endEditCommand()
+        self.pending = True
+        self.commitTimer.start(self.commitDelay)
+        return True
+
+    def commit(self):
+        """
+        commit
+        Commits the edits written since the last commit to the data provider,
+        the layer stays in edit mode afterwards
+        @return True if the edits were committed
+        """
+        self.commitTimer.stop()
+        if not self.pending or self.layer is None:
+            return True
+        self.pending = False
+        if not self.layer.isEditable():
+            # QGIS already committed or rolled back the edits
+            return True
+        if not self.layer.commitChanges():
+            commitErrors = self.layer.commitErrors()
+            commitError = str(len(commitErrors))
+            if commitErrors:
+                commitError += '\n' + str(commitErrors[0])
+            self.editFailed.emit(commitError)
+            return False
+        self.layer.startEditing()
+        return True
+
+    def discard(self):
+        """
+        discard
+        Stops waiting to commit, the edits stay in the layer edit buffer
+        """
+        self.commitTimer.stop()
+        self.pending = False
@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 """
-    fs3Graphs.py -- This file creates plotly graphs and writes them to a 
-                 file so that the QWebView can load them into the gui.
+    fs3Graphs.py -- This file creates plotly graphs and the page that
+                 shows them so that the QWebView can load them into the gui.
               -- For more information see : https://github.com/andreasfoulk/FS3
               
     Copyright (c) 2018 Orden Aitchedji, McKenna Duzac, Andreas Foulk, Tanner Lee
@@ -13,19 +13,167 @@
 import tempfile
 import os
 import platform
-from math import log10
-from operator import itemgetter
-
-import plotly
-import plotly.graph_objs as go
+import json
+import base64
+import numpy
 
 from PyQt5.QtCore import QCoreApplication
 
-from qgis.core import NULL
-
+from .fs3Columns import FS3EncodedColumn, sortOrder
 from .graphOptions import GraphOptionsWindow
 from .layerFieldGetter import LayerFieldGetter
 
+# Page loaded once in the QWebView, figures are pushed with fs3Update
+GRAPH_PAGE = """<html>
+<head>
+<meta charset="utf-8" />
+<script src="{polyfill}"></script>
+<script src="{plotly}"></script>
+<style>html, body, #graph {{ width: 100%; height: 100%; margin: 0; overflow: hidden; }}</style>
+</head>
+<body>
+<div id="graph"></div>
+<script>
+var graph = document.getElementById('graph');
+var webgl = (function() {{
+    try {{
+        var canvas = document.createElement('canvas');
+        return !!(window.WebGLRenderingContext &&
+                  (canvas.getContext('webgl') || canvas.getContext('experimental-webgl')));
+    }} catch (error) {{
+        return false;
+    }}
+}}());
+function fs3WebGL() {{
+    return webgl;
+}}
+function fs3Decode(value) {{
+    if (!value || value.bdata === undefined) {{
+        return value;
+    }}
+    var bytes = atob(value.bdata);
+    var view = new Uint8Array(bytes.length);
+    for (var i = 0; i < bytes.length; i++) {{
+        view[i] = bytes.charCodeAt(i);
+    }}
+    var typed = value.dtype === 'i4' ? new Int32Array(view.buffer) : new Float64Array(view.buffer);
+    return Array.prototype.slice.call(typed);
+}}
+function fs3Update(figure) {{
+    figure.data.forEach(function(trace) {{
+        ['x', 'y', 'values'].forEach(function(key) {{
+            trace[key] = fs3Decode(trace[key]);
+        }});
+        if (!webgl && trace.type === 'scattergl') {{
+            trace.type = 'scatter';
+        }}
+    }});
+    Plotly.react(graph, figure.data, figure.layout, {{showLink: false}});
+}}
+window.addEventListener('resize', function() {{
+    if (graph.data) {{
+        Plotly.Plots.resize(graph);
+    }}
+}});
+</script>
+{figure}
+</body>
+</html>
+"""
+
+# Points drawn per pixel of graph width by downsampled line and scatter graphs
+POINTS_PER_PIXEL = 2
+
+# Graph width assumed before the graph frame was shown
+DEFAULT_PLOT_WIDTH = 1000
+
+# Points above which line and scatter graphs are drawn with WebGL
+WEBGL_THRESHOLD = 20000
+
+# Points a WebGL graph keeps at most, shared by its series
+WEBGL_POINT_BUDGET = 100000
+
+def encodeArray(values, valid=None):
+    """
+    JSON ready form of a trace array
+    Numbers are packed in a base64 buffer the page decodes, int32 when
+    they are all filled, whole and fit, float64 with NaN for the empty cells otherwise
+    Text and other values stay a list, None in the empty cells
+    values is a numpy array, valid its bool mask, False for the empty cells
+    """
+    values = numpy.asarray(values)
+    if valid is None:
+        valid = numpy.ones(len(values), dtype=bool)
+    if values.dtype.kind not in 'iuf':
+        items = values.tolist()
+        for row in numpy.flatnonzero(~valid).tolist():
+            items[row] = None
+        return items
+    array = values.astype(numpy.float64)
+    array[~valid] = numpy.nan
+    if len(array) > 0 and valid.all() and numpy.isfinite(array).all() and \
+       (array == numpy.round(array)).all() and numpy.abs(array).max() < 2 ** 31:
+        dtype = 'i4'
+    else:
+        dtype = 'f8'
+    data = numpy.ascontiguousarray(array, dtype='<' + dtype).tobytes()
+    return {'dtype': dtype, 'bdata': base64.b64encode(data).decode('ascii')}
+
+def jsonDefault(value):
+    """
+    Serializes the values json does not know, numpy scalars and dates
+    """
+    if isinstance(value, numpy.generic):
+        return value.item()
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+def lttbIndices(xArray, yArray, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling of a line
+    Keeps the first and last points and, in every bucket between them,
+    the point making the largest triangle with the point kept before it
+    and the average of the next bucket
+    returns the int64 numpy array of the kept positions
+    """
+    count = len(yArray)
+    if threshold >= count or threshold < 3:
+        return numpy.arange(count)
+    indices = numpy.empty(threshold, dtype=numpy.int64)
+    indices[0] = 0
+    indices[-1] = count - 1
+    edges = numpy.linspace(1, count - 1, threshold - 1).astype(numpy.int64).tolist()
+    edges.append(count)
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end, nextEnd = edges[bucket], edges[bucket + 1], edges[bucket + 2]
+        averageX = xArray[end:nextEnd].mean()
+        averageY = yArray[end:nextEnd].mean()
+        areas = numpy.abs((xArray[previous] - averageX) * (yArray[start:end] - yArray[previous]) -
+                          (xArray[previous] - xArray[start:end]) * (averageY - yArray[previous]))
+        previous = start + int(areas.argmax())
+        indices[bucket + 1] = previous
+    return indices
+
+def minMaxIndices(yArray, threshold):
+    """
+    Per bucket min/max downsampling, every bucket keeps its lowest and
+    highest point so the vertical extent of each pixel column is drawn
+    returns the int64 numpy array of the kept positions
+    """
+    count = len(yArray)
+    bucketCount = threshold // 2
+    if count <= threshold or bucketCount < 1:
+        return numpy.arange(count)
+    edges = numpy.linspace(0, count, bucketCount + 1).astype(numpy.int64).tolist()
+    indices = []
+    for start, end in zip(edges[:-1], edges[1:]):
+        bucket = yArray[start:end]
+        indices.append(start + int(bucket.argmin()))
+        indices.append(start + int(bucket.argmax()))
+    return numpy.unique(indices)
+
 class Grapher:
     """
     The Grapher class graphs for some reason
@@ -51,12 +199,28 @@ class Grapher:
 
         # Assign with setData
         self.layer = None
-        self.xValues = []
-        self.allYValues = [[]]
-        self.attributes = [[]]
+        # (values, valid) numpy arrays of the x-axis and of every y series
+        self.xValues = (numpy.arange(0), numpy.ones(0, dtype=bool))
+        self.allYValues = []
+        self.columns = None
+        self.encodedColumns = []
         self.uniqueness = []
         self.fields = ['']
         self.limitToSelected = False
+        # FS3Column of the x-axis field, read with the other columns
+        self.xColumn = None
+        # Options xValues and allYValues were prepared with, None when outdated
+        self.preparedOptions = None
+        # JSON of the last figure made
+        self.figureJson = None
+        # Pixel width of the graph, bounds the points of line and scatter graphs
+        self.plotWidth = DEFAULT_PLOT_WIDTH
+        self.downsampled = False
+        # Large line and scatter graphs are drawn with WebGL when the page supports it
+        self.webglThreshold = WEBGL_THRESHOLD
+        self.webglPointBudget = WEBGL_POINT_BUDGET
+        self.webglAvailable = True
+        self.webglTraces = False
 
 
     def openGraphOptions(self):
@@ -79,130 +243,222 @@ class Grapher:
             self.optionsWindow.xAxisDefaultBox.insertItem(0, QCoreApplication.translate("Grapher", "None"))
             self.optionsWindow.xAxisDefaultBox.insertItems(1, fields)
 
-    def setData(self, layer, attributes=None, uniqueness=None, limitToSelected=False, fields=None):
+    def xAxisField(self):
+        """
+        Returns the field selected for the x-axis, None for the row numbers
+        """
+        field = self.optionsWindow.xAxisDefaultBox.currentText()
+        if not field or field == QCoreApplication.translate("Grapher", "None"):
+            return None
+        return field
+
+    def setData(self, layer, columns=None, uniqueness=None, limitToSelected=False, fields=None,
+                xColumn=None, encodedColumns=None):
         """
         Sets self variables
-        xValues defaults to 1 through n if no default is selected
-        Checks if the data should be sorted or transformed
-        Does sort or transform
+        columns are the FS3Column of the graphed fields, xColumn the FS3Column
+        of the selected x-axis field, the layer is never read here
+        encodedColumns are the FS3EncodedColumn of the text columns, None
+        for the others, text is sorted on their codes
+        The data is sorted and transformed by the next makeGraph
         """
         self.layer = layer
         self.limitToSelected = limitToSelected
-        self.attributes = attributes
+        self.columns = columns
+        self.encodedColumns = encodedColumns or []
         if uniqueness:
             self.uniqueness = uniqueness
         if fields:
             self.fields = fields
+        self.xColumn = xColumn
+        self.preparedOptions = None
 
-        if not self.attributes:
-            return
+    def dataOptions(self):
+        """
+        Returns the options the graphed values depend on,
+        the sorting, the transform and the x-axis field
+        """
+        return (self.optionsWindow.dataSortingBox.currentText(),
+                self.optionsWindow.dataTransformBox.currentText(),
+                self.xAxisField())
+
+    def prepareData(self):
+        """
+        Sets xValues and allYValues from the columns
+        xValues defaults to 0 through n - 1 if no default is selected
+        Checks if the data should be sorted or transformed
+        Does sort or transform, with numpy on the whole columns
+        """
+        self.preparedOptions = self.dataOptions()
 
         # Set x-axis to selected field
-        if self.optionsWindow.xAxisDefaultBox.currentText() == QCoreApplication.translate("Grapher", "None"):
-            self.xValues = list(range(len(self.attributes[0])))
-        else:
-            if self.layer:
-                if self.limitToSelected:
-                    if not self.layer.getSelectedFeatures().isClosed():
-                        # If there are features selected, get them
-                        features = self.layer.getSelectedFeatures()
-                    else:
-                        # Else get all features
-                        features = self.layer.getFeatures()
-                else:
-                    features = self.layer.getFeatures()
-
-                self.xValues = []
-                for feature in features:
-                    fieldIndex = feature.fieldNameIndex(self.optionsWindow.xAxisDefaultBox.currentText())
-                    value = feature.attributes()[fieldIndex]
-                    if value == NULL:
-                        value = QCoreApplication.translate("Grapher", "NULL")
-                    self.xValues.append(value)
-
-        self.allYValues = self.attributes
-
-        # Apply sort and transform
-        if self.optionsWindow.dataSortingBox.currentText() == QCoreApplication.translate("Grapher", "Ascending"):
-            zipped = zip(self.xValues, *self.allYValues)
-            zipped = sorted(zipped, key=itemgetter(1))
-            self.xValues, *self.allYValues = zip(*list(zipped))
-            self.xValues = list(self.xValues)
-            self.allYValues = [list(yValues) for yValues in self.allYValues]
-
-        if self.optionsWindow.dataSortingBox.currentText() == QCoreApplication.translate("Grapher", "Descending"):
-            zipped = zip(self.xValues, *self.allYValues)
-            zipped = sorted(zipped, key=itemgetter(1), reverse=True)
-            self.xValues, *self.allYValues = zip(*list(zipped))
-            self.xValues = list(self.xValues)
-            self.allYValues = [list(yValues) for yValues in self.allYValues]
+        xAxisField = self.xAxisField()
+        rowNumbers = xAxisField is None or self.xColumn is None or self.xColumn.name != xAxisField
+        self.allYValues = [(column.values, column.valid) for column in self.columns]
+        if not rowNumbers:
+            self.xValues = (self.xColumn.values, self.xColumn.valid)
+
+        # Apply sort and transform, rows are sorted on the first field
+        sorting = self.optionsWindow.dataSortingBox.currentText()
+        if sorting in (QCoreApplication.translate("Grapher", "Ascending"),
+                       QCoreApplication.translate("Grapher", "Descending")):
+            order = sortOrder(*self.sortKeys(),
+                              descending=sorting == QCoreApplication.translate("Grapher", "Descending"))
+            self.allYValues = [(values[order], valid[order]) for values, valid in self.allYValues]
+            if not rowNumbers:
+                self.xValues = (self.xValues[0][order], self.xValues[1][order])
 
         if self.optionsWindow.dataTransformBox.currentText() == QCoreApplication.translate("Grapher", "Log"):
             temp = []
-            for yValues in self.allYValues:
-                try:
-                    temp.append([log10(val) if val > 0 else 0 for val in yValues])
-                except TypeError:
+            for values, valid in self.allYValues:
+                if values.dtype.kind not in 'iuf':
                     # Don't do anything for characture data
-                    temp.append(yValues)
+                    temp.append((values, valid))
+                    continue
+                logValues = numpy.zeros(len(values))
+                positive = valid & (values > 0)
+                logValues[positive] = numpy.log10(values[positive].astype(numpy.float64))
+                temp.append((logValues, valid))
             self.allYValues = temp
 
-        ## Prepare data for plotly
-        # Replace NULL with 'NULL'
-        for i in range(len(self.allYValues)):
-            for j in range(len(self.allYValues[i])):
-                if self.allYValues[i][j] == NULL:
-                    self.allYValues[i][j] = QCoreApplication.translate("Grapher", "NULL")
-
         # Plotly doesn't like unordered number for x, will auto reorder them
-        if self.optionsWindow.xAxisDefaultBox.currentText() == QCoreApplication.translate("Grapher", "None"):
-            self.xValues = list(range(len(self.allYValues[0])))
+        if rowNumbers:
+            count = len(self.columns[0])
+            self.xValues = (numpy.arange(count), numpy.ones(count, dtype=bool))
 
+    def sortKeys(self):
+        """
+        Typed keys of the first field, numbers for a numeric field and
+        dictionary codes for text
+        returns (numeric numpy array of keys, bool numpy array of the filled cells)
+        """
+        column = self.columns[0]
+        if column.values.dtype.kind in 'iuf':
+            return column.values, column.valid
+        encodedColumn = None
+        if self.encodedColumns:
+            encodedColumn = self.encodedColumns[0]
+        if encodedColumn is None:
+            encodedColumn = FS3EncodedColumn(column.toList(None))
+        return encodedColumn.codes, encodedColumn.codes >= 0
 
     def makeGraph(self):
         """
         Creates the currently selected graph type
-        returns the path of the created graph
+        returns the JSON of the figure, None if there is nothing to graph
         """
 
         # Ensure there is data to graph
-        if not self.attributes:
-            return ''
+        if not self.columns:
+            return None
 
-        # refesh data to include any options from the options window
-        self.setData(self.layer, self.attributes, self.uniqueness, self.limitToSelected, self.fields)
+        # Sort and transform again only if the data or these options changed
+        if self.preparedOptions != self.dataOptions():
+            self.prepareData()
+        self.downsampled = False
+        self.webglTraces = False
 
         if self.graphTypeBox.currentText() == QCoreApplication.translate("Grapher", "Bar"):
-            plotPath = self.makeBarGraph()
+            figure = self.makeBarGraph()
         elif self.graphTypeBox.currentText() == QCoreApplication.translate("Grapher", "Pie"):
-            plotPath = self.makePieGraph()
+            figure = self.makePieGraph()
         elif self.graphTypeBox.currentText() == QCoreApplication.translate("Grapher", "Line"):
-            plotPath = self.makeLineGraph()
+            figure = self.makeLineGraph()
         elif self.graphTypeBox.currentText() == QCoreApplication.translate("Grapher", "Scatter"):
-            plotPath = self.makeScatterGraph()
+            figure = self.makeScatterGraph()
         else:
-            plotPath = ''
+            return None
+
+        self.figureJson = json.dumps(figure, default=jsonDefault)
+        return self.figureJson
+
+    def graphPage(self, figureJson=None):
+        """
+        Builds the page plotly is loaded in
+        figureJson is drawn on load when given, else the page waits for fs3Update
+        returns the html of the page
+        """
+        figure = ''
+        if figureJson:
+            figure = '<script>fs3Update({});</script>'.format(figureJson)
+        return GRAPH_PAGE.format(polyfill=self.polyfillpath, plotly=self.plotlypath,
+                                 figure=figure)
+
+    def writeGraph(self):
+        """
+        Saves the last figure in a page of its own to a tempfile
+        returns the path to this tempfile
+        """
+        # Generate a temporary html file that can be viewed on a web browser
+        # Allows use of plotly's full features QGIS does not support.
+        plotPath = os.path.join(tempfile.gettempdir(), 'temp_plot_name.html')
+        with open(plotPath, "w") as file:
+            file.write(self.graphPage(self.figureJson))
 
         return plotPath
 
+    def plotSeries(self, lineGraph):
+        """
+        Downsamples every y series to the number of points the graph width can show
+        Lines keep their shape with LTTB, scatters and WebGL series keep
+        the extremes of every bucket
+        Text series are thinned out evenly
+        Series drawn with WebGL keep more points, up to the WebGL point
+        budget whatever the graph width, so they can be zoomed into
+        returns a list of ((xValues, xValid), (yValues, yValid)), one per series
+        """
+        pointCount = sum(len(values) for values, valid in self.allYValues)
+        self.webglTraces = self.webglAvailable and pointCount > self.webglThreshold
+        if self.webglTraces:
+            maxPoints = max(self.webglPointBudget // len(self.allYValues), 1)
+        else:
+            maxPoints = max(self.plotWidth, 1) * POINTS_PER_PIXEL
+        xValues, xValid = self.xValues
+        series = []
+        for yValues, yValid in self.allYValues:
+            if len(yValues) <= maxPoints:
+                series.append((self.xValues, (yValues, yValid)))
+                continue
+            if yValues.dtype.kind not in 'iuf':
+                rows = numpy.linspace(0, len(yValues) - 1, maxPoints).astype(numpy.int64)
+            else:
+                rows = numpy.flatnonzero(yValid)
+                if lineGraph and not self.webglTraces:
+                    if xValues.dtype.kind not in 'iuf':
+                        # Text on the x-axis, the positions are used
+                        positions = rows.astype(float)
+                    else:
+                        # Points without an x value are not drawn
+                        rows = rows[xValid[rows]]
+                        positions = xValues[rows].astype(float)
+                    rows = rows[lttbIndices(positions, yValues[rows].astype(float), maxPoints)]
+                else:
+                    rows = rows[minMaxIndices(yValues[rows], maxPoints)]
+            # A wider graph only shows more points without WebGL
+            self.downsampled = not self.webglTraces
+            series.append(((xValues[rows], xValid[rows]), (yValues[rows], yValid[rows])))
+        return series
+
     def makeBarGraph(self):
         """
-        Constructs a plotly js bar graph and saves to a tempfile
-        returns the path to this tempfile
+        Constructs a plotly js bar graph
+        returns the figure
         """
 
         data = []
         i = 0
-        for yValues in self.allYValues:
-            trace = go.Bar(
-                x=self.xValues,
-                y=yValues,
+        x = encodeArray(*self.xValues)
+        for yValues, yValid in self.allYValues:
+            trace = dict(
+                type='bar',
+                x=x,
+                y=encodeArray(yValues, yValid),
                 name=self.fields[i]
             )
             data.append(trace)
             i += 1
 
-        layout = go.Layout(
+        layout = dict(
             title=self.optionsWindow.graphTitleEdit.text(),
             barmode='group',
             xaxis=dict(
@@ -213,77 +469,49 @@ class Grapher:
                 )
         )
 
-        fig = go.Figure(data=data, layout=layout)
-
-        # first lines of additional html with the link to the local javascript
-        rawPlot = '<head><meta charset="utf-8" /><script src="{}"></script><script src="{}"></script></head>'.format(self.polyfillpath, self.plotlypath)
-
-        # call the plot method without all the javascript code
-        rawPlot += plotly.offline.plot(fig, output_type='div',
-                                       filename='bar-graph', include_plotlyjs=False, show_link=False, image='png')
-
-        # Generate a temporary html file that can be viewed on a web browser
-        # Allows use of plotly's full features QGIS does not support.
-        plotPath = os.path.join(tempfile.gettempdir(), 'temp_plot_name.html')
-        with open(plotPath, "w") as file:
-            file.write(rawPlot)
-
-        return plotPath
+        return dict(data=data, layout=layout)
 
 
     def makePieGraph(self):
         """
-        Constructs a plotly js pie graph and saves to a tempfile
-        returns the path to this tempfile
+        Constructs a plotly js pie graph
+        returns the figure
         """
 
-        trace = go.Pie(
-            labels=self.uniqueness.uniqueValues,
-            values=self.uniqueness.uniqueNumOccur
+        trace = dict(
+            type='pie',
+            labels=self.uniqueness.displayValues(),
+            values=encodeArray(numpy.array(self.uniqueness.uniqueNumOccur))
         )
 
         data = [trace]
-        layout = go.Layout(
+        layout = dict(
             title=self.optionsWindow.graphTitleEdit.text(),
             barmode='group'
         )
 
-        fig = go.Figure(data=data, layout=layout)
-
-        # first lines of additional html with the link to the local javascript
-        rawPlot = '<head><meta charset="utf-8" /><script src="{}"></script><script src="{}"></script></head>'.format(self.polyfillpath, self.plotlypath)
-
-        # call the plot method without all the javascript code
-        rawPlot += plotly.offline.plot(fig, output_type='div',
-                                       filename='pie-graph', include_plotlyjs=False, show_link=False, image='png')
-
-        # Generate a temporary html file that can be viewed on a web browser
-        # Allows use of plotly's full features QGIS does not support.
-        plotPath = os.path.join(tempfile.gettempdir(), 'temp_plot_name.html')
-        with open(plotPath, "w") as file:
-            file.write(rawPlot)
-
-        return plotPath
+        return dict(data=data, layout=layout)
 
 
     def makeLineGraph(self):
         """
-        Constructs a plotly js line graph and saves to a tempfile
-        returns the path to this tempfile
+        Constructs a plotly js line graph
+        returns the figure
         """
 
         data = []
         i = 0
-        for yValues in self.allYValues:
-            trace = go.Scatter(
-                x=self.xValues,
-                y=yValues,
+        for (xValues, xValid), (yValues, yValid) in self.plotSeries(True):
+            trace = dict(
+                type='scattergl' if self.webglTraces else 'scatter',
+                x=encodeArray(xValues, xValid),
+                y=encodeArray(yValues, yValid),
                 name=self.fields[i]
             )
             data.append(trace)
             i += 1
 
-        layout = go.Layout(
+        layout = dict(
             title=self.optionsWindow.graphTitleEdit.text(),
             barmode='group',
             xaxis=dict(
@@ -294,44 +522,29 @@ class Grapher:
                 )
         )
 
-        fig = go.Figure(data=data, layout=layout)
-
-        # first lines of additional html with the link to the local javascript
-        rawPlot = '<head><meta charset="utf-8" /><script src="{}"></script><script src="{}"></script></head>'.format(self.polyfillpath, self.plotlypath)
-
-        # call the plot method without all the javascript code
-
-        rawPlot += plotly.offline.plot(fig, output_type='div',
-                                       include_plotlyjs=False, filename='/tmp/line-graph', show_link=False, image='png')
-
-        # Generate a temporary html file that can be viewed on a web browser
-        # Allows use of plotly's full features QGIS does not support.
-        plotPath = os.path.join(tempfile.gettempdir(), 'temp_plot_name.html')
-        with open(plotPath, "w") as file:
-            file.write(rawPlot)
-
-        return plotPath
+        return dict(data=data, layout=layout)
 
 
     def makeScatterGraph(self):
         """
-        Constructs a plotly js scatter chart and saves to a tempfile
-        returns the path to this tempfile
+        Constructs a plotly js scatter chart
+        returns the figure
         """
 
         data = []
         i = 0
-        for yValues in self.allYValues:
-            trace = go.Scatter(
-                x=self.xValues,
-                y=yValues,
+        for (xValues, xValid), (yValues, yValid) in self.plotSeries(False):
+            trace = dict(
+                type='scattergl' if self.webglTraces else 'scatter',
+                x=encodeArray(xValues, xValid),
+                y=encodeArray(yValues, yValid),
                 name=self.fields[i],
                 mode='markers'
             )
             data.append(trace)
             i += 1
 
-        layout = go.Layout(
+        layout = dict(
             title=self.optionsWindow.graphTitleEdit.text(),
             barmode='group',
             xaxis=dict(
@@ -342,19 +555,4 @@ class Grapher:
                 )
         )
 
-        fig = go.Figure(data=data, layout=layout)
-
-        # first lines of additional html with the link to the local javascript
-        rawPlot = '<head><meta charset="utf-8" /><script src="{}"></script><script src="{}"></script></head>'.format(self.polyfillpath, self.plotlypath)
-
-        # call the plot method without all the javascript code
-        rawPlot += plotly.offline.plot(fig, output_type='div',
-                                       include_plotlyjs=False, show_link=False, filename='/tmp/scatter-graph', image='png')
-
-        # Generate a temporary html file that can be viewed on a web browser
-        # Allows use of plotly's full features QGIS does not support.
-        plotPath = os.path.join(tempfile.gettempdir(), 'temp_plot_name.html')
-        with open(plotPath, "w") as file:
-            file.write(rawPlot)
-
-        return plotPath
+        return dict(data=data, layout=layout)
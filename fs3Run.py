@@ -17,26 +17,36 @@ import os
 import tempfile
 import webbrowser
 
-from qgis.core import QgsProject, NULL
+from qgis.core import QgsApplication, QgsProject
 
 from PyQt5 import uic
-from PyQt5.QtCore import Qt, pyqtSlot, QUrl, pyqtSignal, QTimer, QCoreApplication
+from PyQt5.QtCore import Qt, pyqtSlot, QUrl, QTimer, QCoreApplication, QSettings
 from PyQt5.QtWidgets import QApplication, QMainWindow, QErrorMessage
-from PyQt5.QtWidgets import QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem
+from PyQt5.QtWidgets import QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem, QTableView
+from PyQt5.QtWebKit import QWebSettings
 from PyQt5.QtWebKitWidgets import QWebView
-from PyQt5.QtGui import QColor, QIcon
+from PyQt5.QtGui import QColor, QIcon, QPalette
 
 from .layerFieldGetter import LayerFieldGetter
 from .fs3Stats import FS3NumericalStatistics, FS3CharacterStatistics
-from .fs3Stats import removeEmptyCells
-from .fs3Graphs import Grapher
-from .fs3Unique import FS3Uniqueness
-from .roundFunc import decimalRound
+from .fs3Task import FS3RefreshTask, FS3RefreshSettings
+from .fs3Table import FS3ColumnTableModel, FS3SortProxyModel
+from .fs3Edit import FS3EditBuffer
+from .fs3Cache import FS3ColumnCache, COLUMN_CACHE_BUDGET
+from .fs3Graphs import Grapher, WEBGL_THRESHOLD, WEBGL_POINT_BUDGET
 
 from .resources import *
 
 QApplication.setAttribute(Qt.AA_EnableHighDpiScaling, True)
 
+# Milliseconds to wait for more refresh triggers before refreshing
+REFRESH_DELAY = 250
+
+# Loading states of the graph page
+GRAPH_PAGE_EMPTY = 0
+GRAPH_PAGE_LOADING = 1
+GRAPH_PAGE_READY = 2
+
 FORM_CLASS, _ = uic.loadUiType(os.path.join(
     os.path.dirname(__file__), 'fs3.ui'))
 
@@ -46,7 +56,6 @@ class FS3MainWindow(QMainWindow, FORM_CLASS):
     Handles the creation and display of the window.
     Makes use of the fs3.ui QT ui file.
     """
-    resized = pyqtSignal()
     def __init__(self, parent=None):
         super(FS3MainWindow, self).__init__(parent)
         self.setupUi(self)
@@ -57,10 +66,25 @@ class FS3MainWindow(QMainWindow, FORM_CLASS):
 
         self.fieldGetterInst = LayerFieldGetter()
         self.grapher = Grapher(self.graphTypeBox)
+        self.grapher.webglThreshold = QSettings().value('FS3/webglPointThreshold',
+                                                        WEBGL_THRESHOLD, type=int)
+        self.grapher.webglPointBudget = QSettings().value('FS3/webglPointBudget',
+                                                          WEBGL_POINT_BUDGET, type=int)
         self.currentProject = QgsProject.instance()
         self.currentLayer = None
         self.allFields = None
-        self.emptyCellDict = {}    #{feature_id:cell}
+        # Columns of every viewed layer, the budget is set in megabytes
+        cacheBudget = QSettings().value('FS3/columnCacheMegabytes',
+                                        COLUMN_CACHE_BUDGET // (1024 * 1024), type=int)
+        self.columnCache = FS3ColumnCache(cacheBudget * 1024 * 1024)
+        self.watchedLayers = set()    #{layer_id}
+        self.dataVersion = 0
+        self.refreshTask = None
+        self.refreshMessage = ''
+        # Last finished refresh and the stages it was shown with
+        self.refreshResult = None
+        self.shownPrecision = None
+        self.renderPending = False
 
         self.percentile25Update()
         self.currentDecimalPrecision = 0
@@ -70,12 +94,20 @@ class FS3MainWindow(QMainWindow, FORM_CLASS):
         ### Tabs
         self.tabFields.currentChanged.connect(self.graphTabLoaded)
         self.dataTableLayout = QVBoxLayout()
-        self.tableWidget = QTableWidget()
-
-        ### Data Table Widget Connection
-        self.tableWidget.cellChanged.connect(self.attributeCellChanged)
-        self.horizontalHeader = self.tableWidget.horizontalHeader()
-        self.horizontalHeader.sectionClicked.connect(self.handleDataSortSignal)
+        self.tableModel = FS3ColumnTableModel()
+        self.sortModel = FS3SortProxyModel()
+        self.sortModel.setSourceModel(self.tableModel)
+        self.tableView = QTableView()
+        self.tableView.setModel(self.sortModel)
+
+        ### Data Table View Connection
+        self.tableModel.cellEdited.connect(self.attributeCellChanged)
+        self.editBuffer = FS3EditBuffer()
+        self.editBuffer.editFailed.connect(self.error.showMessage)
+        self.horizontalHeader = self.tableView.horizontalHeader()
+        # Keep the feature order until a header is clicked
+        self.horizontalHeader.setSortIndicator(-1, Qt.AscendingOrder)
+        self.tableView.setSortingEnabled(True)
         self.statisticLayout = QVBoxLayout()
         self.statisticTable = QTableWidget()
         self.uniqueLayout = QVBoxLayout()
@@ -83,19 +115,34 @@ class FS3MainWindow(QMainWindow, FORM_CLASS):
         self.uniqueTable.verticalHeader().hide()
         self.graphLayout = QHBoxLayout()
         self.graphView = QWebView()
+        self.graphView.settings().setAttribute(QWebSettings.WebGLEnabled, True)
+        # The page loads plotly once, figures are pushed into it afterwards
+        self.graphView.loadFinished.connect(self.handleGraphPageLoaded)
+        self.graphPageState = GRAPH_PAGE_EMPTY
+        self.pendingFigure = None
+        self.graphLayout.addWidget(self.graphView)
+        self.graphFrame.setLayout(self.graphLayout)
         self.uniqueHHeader = self.uniqueTable.horizontalHeader()
         self.uniqueHHeader.sectionClicked.connect(self.handleUniqueSortSignal)
 
-        ### Window resized
-        self.resizeTimer = QTimer()
-        self.resizeTimer.setSingleShot(True)
-        self.resizeTimer.timeout.connect(self.windowTimeout)
-        self.resized.connect(self.windowResized)
+        ### Refresh scheduler, bursts of triggers start a single refresh
+        self.refreshTimer = QTimer()
+        self.refreshTimer.setSingleShot(True)
+        self.refreshTimer.timeout.connect(self.refreshAttributes)
 
         ###Background Color Brush
         self.backgroundBrush = QColor.fromRgb(230, 230, 250)
         self.defaultBrush = QColor.fromRgbF(0, 0, 0, 0)
 
+        ### Zebra rows of the data table are painted by the view
+        tablePalette = self.tableView.palette()
+        tablePalette.setColor(QPalette.AlternateBase, tablePalette.color(QPalette.Base))
+        tablePalette.setColor(QPalette.Base, self.backgroundBrush)
+        self.tableView.setPalette(tablePalette)
+        self.tableView.setAlternatingRowColors(True)
+        self.dataTableLayout.addWidget(self.tableView)
+        self.dataTab.setLayout(self.dataTableLayout)
+
         #Refresh for the connecters
         self.refresh()
 
@@ -110,24 +157,29 @@ class FS3MainWindow(QMainWindow, FORM_CLASS):
         self.percentile5.clicked.connect(self.percentile5Update)
         self.percentileHighEnd.clicked.connect(self.percentileHighEndUpdate)
         self.percentilesLineEdit.textChanged.connect(self.percentileTextChanged)
+        self.approximatePercentiles.stateChanged.connect(self.handleApproximateChanged)
         # Limit to Selected
         self.limitToSelected.stateChanged.connect(self.handleLimitSelected)
         # Toggle Edit Mode
         self.editModeCheck.stateChanged.connect(self.handleEditModeChecked)
         # Decimal Selector
         self.numberOfDecimalsBox.valueChanged.connect(self.handleDecimalChanged)
+        # Top-K unique values
+        self.uniqueTopKCheck.stateChanged.connect(self.handleUniqueTopKChanged)
+        self.uniqueTopKBox.valueChanged.connect(self.handleUniqueTopKChanged)
 
         ### Layer Combo Box and Field List Widget
         self.selectLayerComboBox.currentIndexChanged \
                         .connect(self.refreshFields)
         self.selectFieldListWidget.itemSelectionChanged \
-                        .connect(self.refreshAttributes)
+                        .connect(self.scheduleRefresh)
 
         ### Handles graph stuffs
-        self.graphTypeBox.currentIndexChanged.connect(self.refreshAttributes)
+        self.graphTypeBox.currentIndexChanged.connect(self.scheduleRender)
 
         self.openGraphSettings.clicked.connect(self.grapher.openGraphOptions)
-        self.grapher.optionsWindow.applyButton.clicked.connect(self.refreshGraph)
+        # A new x-axis field is read by a refresh, the graph follows its result
+        self.grapher.optionsWindow.applyButton.clicked.connect(self.scheduleRender)
 
         self.pngExportButton.clicked.connect(self.exportToPNG)
         self.htmlOpenButton.clicked.connect(self.openHTML)
@@ -147,7 +199,7 @@ class FS3MainWindow(QMainWindow, FORM_CLASS):
         """
         self.refreshLayers()
         self.refreshFields()
-        self.refreshAttributes()
+        self.scheduleRefresh()
 
 
     @pyqtSlot()
@@ -196,20 +248,37 @@ class FS3MainWindow(QMainWindow, FORM_CLASS):
                 # Ensure the user has entered a valid percentile
                 if float(percentile) < 0 or float(percentile) > 100:
                     return
-            self.refreshAttributes()
+            self.scheduleRefresh()
         except ValueError:
             # The user is either still entering text
             # Or has entered an invalid input
             return
 
 
+    @pyqtSlot()
+    def handleApproximateChanged(self):
+        """
+        handleApproximateChanged
+        Approximate percentiles checkbox
+        """
+        self.scheduleRefresh()
+
+    @pyqtSlot()
+    def handleUniqueTopKChanged(self):
+        """
+        handleUniqueTopKChanged
+        Top unique values checkbox and size
+        """
+        if self.uniqueTopKCheck.isChecked() or self.sender() == self.uniqueTopKCheck:
+            self.scheduleRefresh()
+
     @pyqtSlot()
     def handleLimitSelected(self):
         """
         handleLimitSelected
         Limit to selected checkbox
         """
-        self.refreshAttributes()
+        self.scheduleRefresh()
 
     @pyqtSlot()
     def handleEditModeChecked(self):
@@ -255,63 +324,26 @@ class FS3MainWindow(QMainWindow, FORM_CLASS):
         editingStoppedQGIS
         Handles events when out of Edit Mode
         """
+        # QGIS committed or rolled back the edits written to the layer
+        self.editBuffer.discard()
         if not self.editModeCheck.isChecked():
             # The checkbox is already unchecked, return
             return
         self.editModeCheck.setChecked(False)
 
-    @pyqtSlot('int', 'int')
-    def attributeCellChanged(self, row, column):
+    @pyqtSlot(int, int, object)
+    def attributeCellChanged(self, row, column, newValue):
         """
         attributeCellChanged
         Handles updates case any change were made in Edit Mode
+        The change is written to the layer and committed with the next edits
         @param row Row of data table cell that was changed
         @param column Column of data table cell that was changed
+        @param newValue Text entered in the cell
         """
-        newValue = self.tableWidget.item(row, column)
         if self.currentLayer.isEditable():
-            # Make the change then commit the change
-            fieldname = self.tableWidget.horizontalHeaderItem(column).text()
-            for fid, cell in self.emptyCellDict.items():
-                feature = self.currentLayer.getFeature(fid)
-                fieldIndex = feature.fieldNameIndex(fieldname)
-                if cell == newValue:
-                    success = self.currentLayer.changeAttributeValue(fid,
-                                                            fieldIndex,
-                                                            newValue.text())
-
-                    if success:
-                        # Update was successful, commit changes
-                        successCommit = self.currentLayer.commitChanges()
-                        if not successCommit:
-                            commitError = str((len(self.currentLayer.commitErrors())))
-                            commitError += '\n' + str((self.currentLayer.commitErrors()[0]))
-                            self.error.showMessage(commitError)
-                        else:
-                            #Else the operation was a success
-                            self.currentLayer.startEditing()
-                    else:
-                        # Update failed, report error
-                        updateError = QCoreApplication.translate("FS3MainWindow", "Attribute update failed")
-                        self.error.showMessage(updateError)
-
-
-    @pyqtSlot()
-    def handleDataSortSignal(self):
-        """
-        handleDataSortSignal
-        Handles propper sorting of statistic data
-        """
-        #Recolor the table
-        for i in range(0, self.tableWidget.columnCount()):
-            for j in range(0, self.tableWidget.rowCount()):
-                cell = self.tableWidget.item(j, i)
-                if (j%2) == 0:
-                    #This is an even row, color it
-                    cell.setBackground(self.backgroundBrush)
-                else:
-                    #This is an odd row, default its color
-                    cell.setBackground(self.defaultBrush)
+            fid, fieldIndex = self.tableModel.cellFeature(row, column)
+            self.editBuffer.addChange(fid, fieldIndex, newValue)
 
     @pyqtSlot()
     def handleUniqueSortSignal(self):
@@ -336,8 +368,47 @@ class FS3MainWindow(QMainWindow, FORM_CLASS):
         handleSelectionChanged
         Update on a new selection
         """
-        #If there are selected layers in QGIS
-        self.refreshAttributes()
+        # Columns read from the selection are outdated
+        layer = self.sender()
+        self.columnCache.invalidateLayer(layer.id(), True)
+        #The selection only matters when the tabs are limited to it
+        if layer == self.currentLayer and self.limitToSelected.isChecked():
+            self.dataVersion += 1
+            self.scheduleRefresh()
+
+    @pyqtSlot()
+    def handleSubsetStringChanged(self):
+        """
+        handleSubsetStringChanged
+        Update on a new layer filter, the columns read with the
+        previous filter stay cached under their own key
+        """
+        if self.sender() == self.currentLayer:
+            self.dataVersion += 1
+            self.scheduleRefresh()
+
+    @pyqtSlot()
+    def handleLayerDataChanged(self):
+        """
+        handleLayerDataChanged
+        Starts a new data version, the cached columns of the layer are outdated
+        """
+        self.dataVersion += 1
+        self.columnCache.invalidateLayer(self.sender().id())
+
+    @pyqtSlot()
+    def handleLayerDeleted(self):
+        """
+        handleLayerDeleted
+        Frees the cached columns of a removed layer
+        """
+        layer = self.sender()
+        self.columnCache.invalidateLayer(layer.id())
+        self.watchedLayers.discard(layer.id())
+        if layer == self.editBuffer.layer:
+            # Nothing can be committed to a deleted layer
+            self.editBuffer.discard()
+            self.editBuffer.setLayer(None)
 
     @pyqtSlot()
     def handleDecimalChanged(self):
@@ -346,7 +417,7 @@ class FS3MainWindow(QMainWindow, FORM_CLASS):
         Handles Decimal selection box
         """
         self.currentDecimalPrecision = self.numberOfDecimalsBox.value()
-        self.refreshAttributes()
+        self.scheduleRefresh()
 
     def refreshLayers(self):
         """
@@ -365,12 +436,17 @@ class FS3MainWindow(QMainWindow, FORM_CLASS):
         refreshFields
         Reload the fields coboBox with the current content of the field lists
         """
+        # Results computed for the previous layer are not wanted anymore
+        self.cancelRefresh()
+        self.refreshResult = None
+        self.editBuffer.commit()
         self.selectFieldListWidget.clear()
 
         layer = self.fieldGetterInst.getSingleLayer \
                 (self.selectLayerComboBox.currentText())
         if layer != None:
             self.currentLayer = layer
+            self.editBuffer.setLayer(layer)
             self.allFields = self.currentLayer.fields()
             self.selectFieldListWidget.insertItem(0, QCoreApplication.translate("FS3MainWindow", "All"))
             self.selectFieldListWidget.insertItems \
@@ -379,8 +455,17 @@ class FS3MainWindow(QMainWindow, FORM_CLASS):
             # 3 is Extended, 2 is Multi, check the documentation
             self.selectFieldListWidget.setSelectionMode(3)
 
-            # Connect the current layer to a pyqtSlot
-            self.currentLayer.selectionChanged.connect(self.handleSelectionChanged)
+            # The cache follows every layer once viewed, their columns
+            # stay cached until the layer reports a change
+            if layer.id() not in self.watchedLayers:
+                self.watchedLayers.add(layer.id())
+                layer.selectionChanged.connect(self.handleSelectionChanged)
+                layer.subsetStringChanged.connect(self.handleSubsetStringChanged)
+                layer.attributeValueChanged.connect(self.handleLayerDataChanged)
+                layer.featureAdded.connect(self.handleLayerDataChanged)
+                layer.featureDeleted.connect(self.handleLayerDataChanged)
+                layer.dataChanged.connect(self.handleLayerDataChanged)
+                layer.willBeDeleted.connect(self.handleLayerDeleted)
 
             #Listen for editing mode enabled and disabled
             self.currentLayer.editingStarted.connect(self.editingStartedQGIS)
@@ -391,16 +476,33 @@ class FS3MainWindow(QMainWindow, FORM_CLASS):
 
 
 
+    @pyqtSlot()
+    def scheduleRefresh(self):
+        """
+        scheduleRefresh
+        Asks for a refresh, every request arriving within REFRESH_DELAY
+        of the previous one is merged into a single refresh of the latest state
+        """
+        self.refreshTimer.start(REFRESH_DELAY)
+
+    @pyqtSlot()
+    def scheduleRender(self):
+        """
+        scheduleRender
+        Asks for the graph to be drawn again, the statistics are not recomputed
+        """
+        self.renderPending = True
+        self.scheduleRefresh()
+
     @pyqtSlot()
     def refreshAttributes(self):
         """
         refreshAttributes
-        Refresh the table content with coresponding Layer & field selection
+        Starts computing the table content with coresponding Layer & field selection
+        A refresh that is still running is canceled, the results arrive
+        in handleRefreshResult
         """
-        self.tableWidget.setSortingEnabled(False)
-        self.emptyCellDict.clear()
-        self.tableWidget.blockSignals(True)
-        self.tableWidget.clear()
+        self.refreshTimer.stop()
 
         # Get selected fields form list widget
         selectedFields = self.selectFieldListWidget.selectedItems()
@@ -409,154 +511,200 @@ class FS3MainWindow(QMainWindow, FORM_CLASS):
         # If the field is not set yet (Layer was swapped)
         # Return until the refresh is ready
         if len(fields) is 0:
+            self.cancelRefresh()
             return
 
-        if self.limitToSelected.isChecked():
-            if not self.currentLayer.getSelectedFeatures().isClosed():
-                # If there are features selected, get them
-                features = self.currentLayer.getSelectedFeatures()
-            else:
-                # Else get all features
-                features = self.currentLayer.getFeatures()
-        else:
-            features = self.currentLayer.getFeatures()
-
-        # Determine length
-        total = 0
-        for feature in features:
-            total += 1
-        self.tableWidget.setRowCount(total)
-
-        if self.limitToSelected.isChecked():
-            if not self.currentLayer.getSelectedFeatures().isClosed():
-                # If there are features selected, get them
-                features = self.currentLayer.getSelectedFeatures()
-            else:
-                # Else get all features
-                features = self.currentLayer.getFeatures()
+        settings = self.getRefreshSettings(fields)
+        result = self.refreshResult
+        if result is not None and result.settings.computeKey() == settings.computeKey():
+            # Only the display settings changed, the shown result is reused
+            self.cancelRefresh()
+            self.updateStages(settings.percentileArray, settings.precision)
+            return
+        if self.refreshTask is not None and \
+           self.refreshTask.settings.computeKey() == settings.computeKey():
+            # The running refresh already computes this state
+            return
+        self.cancelRefresh()
+
+        # Cached columns are not read from the layer again
+        self.refreshTask = FS3RefreshTask(self.currentLayer, settings)
+        self.refreshTask.resultReady.connect(self.handleRefreshResult)
+        self.refreshTask.distinctEstimated.connect(self.handleDistinctEstimated)
+        self.refreshTask.progressChanged.connect(self.handleRefreshProgress)
+        self.refreshTask.taskTerminated.connect(self.handleRefreshTerminated)
+        self.refreshMessage = QCoreApplication.translate("FS3MainWindow", "Computing statistics")
+        QgsApplication.taskManager().addTask(self.refreshTask)
+
+    def cancelRefresh(self):
+        """
+        cancelRefresh
+        Cancels the running refresh, neither its progress nor its
+        results will be shown
+        """
+        if self.refreshTask is not None:
+            self.refreshTask.resultReady.disconnect(self.handleRefreshResult)
+            self.refreshTask.distinctEstimated.disconnect(self.handleDistinctEstimated)
+            self.refreshTask.progressChanged.disconnect(self.handleRefreshProgress)
+            self.refreshTask.cancel()
+            self.refreshTask = None
+
+    def getRefreshSettings(self, fields):
+        """
+        getRefreshSettings
+        Reads everything a refresh depends on from the user interface
+        @param fields Names of the selected fields
+        @return settings FS3RefreshSettings
+        """
+        settings = FS3RefreshSettings()
+        settings.allFields = QCoreApplication.translate("FS3MainWindow", "All") in fields
+        # Only the shown fields are read, without their geometry
+        if settings.allFields:
+            settings.fields = self.fieldGetterInst.getAllFields(self.currentLayer)
         else:
-            features = self.currentLayer.getFeatures()
-
-        # Data to pass to statistical calculations
-        statValues = []
-        for i in range(len(fields)):
-            statValues.append([])
-
-        # for each row
-        row = 0
-        for feature in features:
-            if QCoreApplication.translate("FS3MainWindow", "All") in fields:
-                attributes = feature.attributes()
-                self.tableWidget.setColumnCount(len(attributes))
-
-                col = 0
-                # for each column value
-                for attribute in attributes:
-                    #Set the precision of numeric fields
-                    if isinstance(attribute, float):
-                        attribute = decimalRound(attribute,
-                                                 self.currentDecimalPrecision)
-                    if attribute == NULL:
-                        cell = MyTableWidgetItem("")
-                        self.tableWidget.setItem(row, col, cell)
-                        self.emptyCellDict[feature.id()] = cell
-                    else:
-                        cell = MyTableWidgetItem(str(attribute))
-                        self.tableWidget.setItem(row, col, cell)
-                        self.emptyCellDict[feature.id()] = cell
-                    col += 1
-
-            else:
-                self.tableWidget.setColumnCount(len(fields))
-
-                col = 0
-                for field in fields:
-                    fieldIndex = feature.fieldNameIndex(field)
-                    attribute = feature.attributes()[fieldIndex]
-                    if isinstance(attribute, float):
-                        attribute = decimalRound(attribute, self.currentDecimalPrecision)
-                    statValues[col].append(attribute)
-                    if attribute == NULL:
-                        cell = MyTableWidgetItem("")
-                        self.tableWidget.setItem(row, col, cell)
-                        self.emptyCellDict[feature.id()] = cell
-                    else:
-                        cell = MyTableWidgetItem(str(attribute))
-                        self.tableWidget.setItem(row, col, cell)
-                        self.emptyCellDict[feature.id()] = cell
-                    col += 1
+            settings.fields = fields
+        settings.loadedFields = settings.fields
+        if not settings.allFields:
+            # The x-axis column is read with the fields, the graph never reads the layer
+            settings.xAxisField = self.grapher.xAxisField()
+            if settings.xAxisField is not None and settings.xAxisField not in settings.fields:
+                settings.loadedFields = settings.fields + [settings.xAxisField]
+        settings.limitToSelected = self.limitToSelected.isChecked()
+        settings.percentileArray = self.getPercentileArray()
+        settings.approximate = self.approximatePercentiles.isChecked()
+        settings.precision = self.currentDecimalPrecision
+        settings.topK = self.getUniqueTopK()
+        settings.summaryTopK = self.uniqueTopKBox.value()
+        settings.columnCache = self.columnCache
+        # The decimals are only applied for display, they are not part of the keys
+        settings.cacheKey = (self.currentLayer.id(), settings.limitToSelected,
+                             self.currentLayer.subsetString())
+        settings.dataVersion = self.dataVersion
+        return settings
 
-            row += 1
-            featureInst = feature
+    @pyqtSlot()
+    def handleRefreshTerminated(self):
+        """
+        handleRefreshTerminated
+        The refresh failed or was canceled from the QGIS task manager
+        """
+        if self.sender() == self.refreshTask:
+            self.refreshTask = None
+            self.statusBar.clearMessage()
 
+    @pyqtSlot(float)
+    def handleRefreshProgress(self, progress):
+        """
+        handleRefreshProgress
+        Shows the progress of the running refresh
+        @param progress Percentage done
+        """
+        # Signals queued by a canceled task may still arrive
+        if self.sender() != self.refreshTask:
+            return
+        self.statusBar.showMessage("{} ({}%)".format(self.refreshMessage, int(progress)))
 
-        if QCoreApplication.translate("FS3MainWindow", "All") in fields:
-            fields = self.fieldGetterInst.getAllFields(self.currentLayer)
-            self.tableWidget.setHorizontalHeaderLabels(fields)
+    @pyqtSlot(int, int, bool)
+    def handleDistinctEstimated(self, distinctEstimate, topK, exact):
+        """
+        handleDistinctEstimated
+        Publishes the number of distinct values before the unique table is shown
+        @param distinctEstimate Number of distinct values, a HyperLogLog
+                                estimate when the rows of several fields
+                                had to be summarised
+        @param topK Number of values the unique table is limited to, 0 for all
+        @param exact True when the values were counted exactly
+        """
+        if self.sender() != self.refreshTask:
+            return
+        if exact:
+            message = QCoreApplication.translate("FS3MainWindow", "{} distinct values")
         else:
-            self.tableWidget.setHorizontalHeaderLabels(fields)
-
-            statistics = []
-            data = []
-            uniquenesses = []
-            for i in range(len(fields)):
-                fieldIndex = featureInst.fieldNameIndex(fields[i])
-                uniquenesses.append(statValues[i])
-                if self.allFields.at(fieldIndex).isNumeric():
-                    #Generate numeric statistics
-                    statistics.append(self.createNumericalStatistics(statValues[i]))
-                    data.append(statValues[i])
-                else:
-                    #Generate character statistics
-                    statistics.append(self.createCharacterStatistics(statValues[i]))
-                    data.append(statValues[i])
-
-            uniqueCalculation = self.createUniqueness(uniquenesses)
-            self.grapher.setData(self.currentLayer, data, uniqueCalculation, self.limitToSelected.isChecked(), fields)
-
-            self.refreshUnique(fields, uniqueCalculation)
-
-            self.refreshStatistics(fields, statistics)
-
+            message = QCoreApplication.translate("FS3MainWindow", "About {} distinct values")
+        message = message.format(distinctEstimate)
+        if topK > 0 and self.getUniqueTopK() is None:
+            message += QCoreApplication.translate("FS3MainWindow", ", showing the top {} only")
+            message = message.format(topK)
+        self.refreshMessage = message
+        self.statusBar.showMessage(message)
+
+    @pyqtSlot(object)
+    def handleRefreshResult(self, result):
+        """
+        handleRefreshResult
+        Fills every tab with the results of a finished refresh
+        @param result FS3RefreshResult
+        """
+        if self.sender() != self.refreshTask:
+            return
+        self.refreshTask = None
+        if result.uniqueness is not None and result.uniqueness.distinctEstimate is not None:
+            self.statusBar.showMessage(self.refreshMessage)
+        else:
+            self.statusBar.clearMessage()
+
+        self.refreshResult = result
+        self.shownPrecision = None
+        if not result.settings.allFields:
+            # Plotly leaves gaps for the empty cells
+            self.grapher.setData(self.currentLayer, result.columnSet.columns, result.uniqueness,
+                                 result.settings.limitToSelected, result.settings.fields,
+                                 result.xColumn, result.encodedColumns)
+            self.renderPending = True
+        self.updateStages(self.getPercentileArray(), self.currentDecimalPrecision)
+
+    def updateStages(self, percentileArray, precision):
+        """
+        updateStages
+        Brings the shown result up to date with the display settings,
+        only the stages depending on a changed setting are run:
+        percentiles recompute the statistics, decimals reformat the tables
+        and graph triggers draw the graph
+        @param percentileArray Array containing user selected percentiles
+        @param precision User-selected number of decimals
+        """
+        result = self.refreshResult
+        fields = result.settings.fields
+        statisticsChanged = False
+        if list(percentileArray) != result.percentileArray:
+            result.setPercentiles(percentileArray)
+            statisticsChanged = True
+        if precision != self.shownPrecision:
+            self.shownPrecision = precision
+            self.refreshDataTable(result, precision)
+            if not result.settings.allFields:
+                self.refreshUnique(fields, result.roundedUniqueness(precision))
+            statisticsChanged = True
+
+        if result.settings.allFields:
+            return
+        if statisticsChanged:
+            self.refreshStatistics(fields, result.roundedStatistics(precision))
+        if self.renderPending:
+            self.renderPending = False
             self.refreshGraph()
 
-        self.dataTableLayout.addWidget(self.tableWidget)
-        self.dataTab.setLayout(self.dataTableLayout)
-        self.tableWidget.blockSignals(False)
-        self.tableWidget.setSortingEnabled(True)
-        self.handleDataSortSignal()
-
-
-    def createNumericalStatistics(self, inputArray):
+    def refreshDataTable(self, result, precision):
         """
-        createNumericalStatistics
-        Methods that instantiates Numerical Statistics and initializes them
-        @param inputArray Data from selected field(s) that statistics should be run on
-        @return numericalStatistics Finished Statistics Object
+        refreshDataTable
+        Method that updates the data table, the cells are only
+        formatted once the view shows them
+        @param result FS3RefreshResult to show
+        @param precision User-selected number of decimals
         """
-        percentileArray = []
-        try:
-            percentileArray = self.percentilesLineEdit.text().split(', ')
-            for percentile in percentileArray:
-                if float(percentile) < 0 or float(percentile) > 100:
-                    raise ValueError
-        except ValueError:
-            self.error.showMessage(QCoreApplication.translate("FS3MainWindow", "Invalid Value for Percentile Detected!"))
-            percentileArray = []
-        originalSize = len(inputArray)
-        emptyCellsRemoved = removeEmptyCells(inputArray)
-        numericalStatistics = FS3NumericalStatistics()
-        numericalStatistics.initialize(emptyCellsRemoved, percentileArray, originalSize)
-        numericalStatistics.roundNumericStatistics(self.currentDecimalPrecision)
-        return numericalStatistics
+        if self.tableModel.columnSet is not result.columnSet:
+            layerFields = self.currentLayer.fields()
+            fieldIndexes = [layerFields.indexFromName(column.name)
+                            for column in result.columnSet.columns]
+            self.tableModel.setColumns(result.columnSet, result.encodedColumns, fieldIndexes)
+        self.tableModel.setPrecision(precision)
 
 
-    def createCharacterStatistics(self, inputArray):
+    def getPercentileArray(self):
         """
-        createNumericalStatistics
-        Methods that instantiates Character Statistics and initializes them
-        @param inputArray Data from selected field(s) that statistics should be run on
-        @return characterStatistics Finished Statistics Object
+        getPercentileArray
+        Reads the user selected percentiles from the line edit
+        @return percentileArray List of percentiles, empty if invalid
         """
         percentileArray = []
         try:
@@ -567,24 +715,16 @@ class FS3MainWindow(QMainWindow, FORM_CLASS):
         except ValueError:
             self.error.showMessage(QCoreApplication.translate("FS3MainWindow", "Invalid Value for Percentile Detected!"))
             percentileArray = []
-        originalSize = len(inputArray)
-        emptyCellsRemoved = removeEmptyCells(inputArray)
-        characterStatistics = FS3CharacterStatistics()
-        characterStatistics.initialize(emptyCellsRemoved, percentileArray, originalSize)
-        characterStatistics.roundCharacterStatistics(self.currentDecimalPrecision)
-        return characterStatistics
+        return percentileArray
 
-    def createUniqueness(self, inputArray):
+    def getUniqueTopK(self):
         """
-        createUniqueness
-        Method that instantiates Uniqueness class and initializes it
-        @param inputArray Data from selected field(s) that uniqueness should be run on
-        @return uniqueness FS3Uniqueness object with calculated uniqueness
+        getUniqueTopK
+        @return Number of most frequent unique values to list, None for all
         """
-        uniqueness = FS3Uniqueness()
-        uniqueness.initialize(inputArray)
-        uniqueness.roundUniqueness(self.currentDecimalPrecision)
-        return uniqueness
+        if self.uniqueTopKCheck.isChecked():
+            return self.uniqueTopKBox.value()
+        return None
 
 
     def refreshStatistics(self, fields, stats):
@@ -736,7 +876,7 @@ class FS3MainWindow(QMainWindow, FORM_CLASS):
         self.uniqueTable.clear()
         self.uniqueTable.setRowCount(unique.totalValues)
         self.uniqueTable.setColumnCount(unique.statCount)
-        horizontalHeaders = unique.statName
+        horizontalHeaders = list(unique.statName)
         #Append the names of the fields to the value field
         horizontalHeaders[0] += ' (['
         for field in fields:
@@ -744,8 +884,8 @@ class FS3MainWindow(QMainWindow, FORM_CLASS):
         horizontalHeaders[0] = horizontalHeaders[0][:-5]
         horizontalHeaders[0] += '])'
         self.uniqueTable.setHorizontalHeaderLabels(horizontalHeaders)
-        for value in unique.uniqueValues:
-            cell = MyTableWidgetItem(str(value))
+        for value in unique.displayValues():
+            cell = MyTableWidgetItem(value)
             self.uniqueTable.setItem(row, col, cell)
             row += 1
         row = 0
@@ -760,6 +900,12 @@ class FS3MainWindow(QMainWindow, FORM_CLASS):
             cell = MyTableWidgetItem(str(percent))
             self.uniqueTable.setItem(row, col, cell)
             row += 1
+        row = 0
+        col += 1
+        for error in unique.displayErrors():
+            cell = MyTableWidgetItem(error)
+            self.uniqueTable.setItem(row, col, cell)
+            row += 1
         self.uniqueTable.setSortingEnabled(True)
         self.handleUniqueSortSignal()
         self.uniqueLayout.addWidget(self.uniqueTable)
@@ -771,32 +917,68 @@ class FS3MainWindow(QMainWindow, FORM_CLASS):
         refreshGraph
         Refreshes the graph on data change
         """
-        plot_path = self.grapher.makeGraph()
-        self.graphView.load(QUrl.fromLocalFile(plot_path))
-        self.graphLayout.addWidget(self.graphView)
-        self.graphFrame.setLayout(self.graphLayout)
+        # Line and scatter graphs are downsampled to the width of the graph
+        self.grapher.plotWidth = self.graphFrame.width()
+        figureJson = self.grapher.makeGraph()
+        if figureJson is None:
+            return
+        self.pendingFigure = figureJson
+        if self.graphPageState == GRAPH_PAGE_READY:
+            self.pushFigure()
+        elif self.graphPageState == GRAPH_PAGE_EMPTY:
+            self.graphPageState = GRAPH_PAGE_LOADING
+            self.graphView.setHtml(self.grapher.graphPage(),
+                                   QUrl.fromLocalFile(tempfile.gettempdir() + os.sep))
+
+    @pyqtSlot(bool)
+    def handleGraphPageLoaded(self, success):
+        """
+        handleGraphPageLoaded
+        Draws the figure made while plotly was loading
+        @param success False if the page could not be loaded
+        """
+        if not success:
+            self.graphPageState = GRAPH_PAGE_EMPTY
+            return
+        self.graphPageState = GRAPH_PAGE_READY
+        # The page reports whether this build can draw WebGL traces
+        webgl = self.graphView.page().mainFrame().evaluateJavaScript('fs3WebGL();')
+        self.grapher.webglAvailable = bool(webgl)
+        if self.pendingFigure is not None and self.grapher.webglTraces and not webgl:
+            # Made for WebGL, made again downsampled for SVG
+            self.pendingFigure = None
+            self.refreshGraph()
+        elif self.pendingFigure is not None:
+            self.pushFigure()
+
+    def pushFigure(self):
+        """
+        pushFigure
+        Hands the pending figure to the loaded page, plotly updates the
+        graph in place and the page resizes it with the window
+        """
+        script = 'fs3Update({});'.format(self.pendingFigure)
+        self.pendingFigure = None
+        self.graphView.page().mainFrame().evaluateJavaScript(script)
         self.graphView.show()
 
+    def closeEvent(self, event):
+        # Buffered edits are not lost with the window
+        self.editBuffer.commit()
+        return super(FS3MainWindow, self).closeEvent(event)
+
     def resizeEvent(self, event):
-        self.resized.emit()
+        # A wider graph can show more of a downsampled series
+        if self.grapher.downsampled and self.graphFrame.width() > self.grapher.plotWidth:
+            self.scheduleRender()
         return super(FS3MainWindow, self).resizeEvent(event)
 
-    @pyqtSlot()
-    def windowResized(self):
-        self.resizeTimer.start(250)
-
-    def windowTimeout(self):
-        currentTab = self.tabFields.currentWidget()
-        if currentTab == self.graphTab:
-            #Refresh the attributes to create a new graph
-            self.refreshAttributes()
-
     @pyqtSlot()
     def graphTabLoaded(self):
         currentTab = self.tabFields.currentWidget()
         if currentTab == self.graphTab:
-            #Refresh the attributes to create a new graph
-            self.refreshAttributes()
+            #Only the graph is drawn again
+            self.scheduleRender()
 
     @pyqtSlot()
     def exportToPNG(self):
@@ -824,18 +1006,27 @@ class FS3MainWindow(QMainWindow, FORM_CLASS):
 
     @pyqtSlot()
     def openHTML(self):
-        # Pull the path of the temp directory
-        directory = tempfile.gettempdir()
-        path = directory+'/temp_plot_name.html'
+        # Save the shown figure in a page of its own
+        if self.grapher.figureJson is None:
+            return
+        path = self.grapher.writeGraph()
         webbrowser.open('file://'+os.path.realpath(path))
 
 class MyTableWidgetItem(QTableWidgetItem):
     """
     Use to overload < operator so that the table will
     sort both numerically and then alphanumerically where appropriate
+    The number of a cell is parsed once, not on every comparison
     """
-    def __lt__(self, other):
+    def __init__(self, text=""):
+        super(MyTableWidgetItem, self).__init__(text)
         try:
-            return float(self.text()) < float(other.text())
+            self.sortNumber = float(text)
         except ValueError:
-            return self.text() < other.text()
+            self.sortNumber = None
+
+    def __lt__(self, other):
+        otherNumber = getattr(other, "sortNumber", None)
+        if self.sortNumber is not None and otherNumber is not None:
+            return self.sortNumber < otherNumber
+        return self.text() < other.text()
@@ -11,12 +11,17 @@
 
 """
 
+import math
+import random
 import statistics
 import numpy
 from qgis.core import NULL
 from .roundFunc import decimalRound
 from PyQt5.QtCore import  QCoreApplication
 
+# Values added to the quantile sketch at once, bounds the memory of a compaction
+SKETCH_BATCH = 65536
+
 # pylint: disable=too-few-public-methods
 class FS3NumericalStatistics(object):
     """
@@ -39,6 +44,7 @@ class FS3NumericalStatistics(object):
         self.stdDevValue = 0
         self.coeffVarValue = 0
         self.percentiles = [0]
+        self.percentileError = None
         self.statCount = 10
         self.statName = [QCoreApplication.translate("FS3NumericalStatistics", "Item Count"),
                          QCoreApplication.translate("FS3NumericalStatistics", "Item Count (Filled)"),
@@ -52,32 +58,61 @@ class FS3NumericalStatistics(object):
                          QCoreApplication.translate("FS3NumericalStatistics", "Standard Deviation"),
                          QCoreApplication.translate("FS3NumericalStatistics", "Coefficient of Variation")]
 
-    def initialize(self, inputArray, percentileArray, originalSize):
+    def initialize(self, inputArray, percentileArray, originalSize, accumulator=None,
+                   sortedColumn=None):
         """
         initialize
         Runs all numerical analysis
         Stores the output in class self.variables
+        @param accumulator Optional FS3StatisticsAccumulator already fed with
+                           the same values, supplies the moment statistics
+        @param sortedColumn Optional cached FS3SortedColumn of the same values,
+                            supplies the median, mode and percentiles
         """
         # Check to ensure we are not passing an empty list
         if len(inputArray) < 1:
+            self.setSummary(None, percentileArray, originalSize)
+            return
+        valueArray = None
+        if sortedColumn is None:
+            valueArray = toNumericArray(inputArray)
+        summary = summarizeArray(valueArray, percentileArray, accumulator, sortedColumn)
+        self.setSummary(summary, percentileArray, originalSize)
+
+    def setSummary(self, summary, percentileArray, originalSize):
+        """
+        setSummary
+        Stores an already computed summary in class self.variables
+        @param summary Dictionary from summarizeArray/summarizeCounts,
+                       None when the field has no filled values
+        @param percentileArray Array containing user selected percentiles
+        @param originalSize Number of items including empty cells
+        """
+        if summary is None:
             self.statName.append(QCoreApplication.translate("FS3NumericalStatistics", "Percentile"))
             return
         self.totalItemCount = originalSize
-        self.itemCount = itemCount(inputArray)
-        self.maxValue = maxValue(inputArray)
-        self.minValue = minValue(inputArray)
-        self.meanValue = meanValue(inputArray)
-        self.medianValue = medianValue(inputArray)
-        self.modeValue = modeValue(inputArray)
-        self.sumValue = sumValue(inputArray)
-        self.stdDevValue = stdDevValue(inputArray)
-        self.coeffVarValue = coeffVarValue(inputArray)
-        self.percentiles = percentileValues(inputArray, percentileArray)
+        self.itemCount = summary['itemCount']
+        self.maxValue = summary['maxValue']
+        self.minValue = summary['minValue']
+        self.meanValue = summary['meanValue']
+        self.medianValue = summary['medianValue']
+        self.modeValue = summary['modeValue']
+        self.sumValue = summary['sumValue']
+        self.stdDevValue = summary['stdDevValue']
+        self.coeffVarValue = summary['varianceValue']
+        self.percentiles = summary['percentiles']
+        self.percentileError = summary['percentileError']
         # 10 corresponds to our statistics + 2 extras generated by the table
         self.statCount = 11 + len(self.percentiles)
 
+        errorText = ''
+        if self.percentileError:
+            errorText = QCoreApplication.translate("FS3NumericalStatistics", " (approx. +/- {}% rank)")
+            errorText = errorText.format(decimalRound(self.percentileError * 100, 2))
+            self.statName[6] += errorText
         for percentileNumber in percentileArray:
-            self.statName.append(QCoreApplication.translate("FS3NumericalStatistics", "Percentile: ") + str(percentileNumber) + '%')
+            self.statName.append(QCoreApplication.translate("FS3NumericalStatistics", "Percentile: ") + str(percentileNumber) + '%' + errorText)
 
     def roundNumericStatistics(self, precision):
         """
@@ -131,6 +166,7 @@ class FS3CharacterStatistics(object):
         self.stdDevLength = 0
         self.coeffVarLength = 0
         self.percentiles = [0]
+        self.percentileError = None
         self.statCount = 10
         self.statName = [QCoreApplication.translate("fs3characterstatistics", "Item Count"),
                          QCoreApplication.translate("fs3characterstatistics", "Item Count (Filled)"),
@@ -144,37 +180,62 @@ class FS3CharacterStatistics(object):
                          QCoreApplication.translate("fs3characterstatistics", "Standard Deviation (Length)"),
                          QCoreApplication.translate("fs3characterstatistics", "Coefficient of Variation (Length)")]
 
-    def initialize(self, inputArray, percentileArray, originalSize):
+    def initialize(self, inputArray, percentileArray, originalSize, accumulator=None,
+                   sortedColumn=None):
         """
         initialize
         Runs all numerical analysis
         Stores the output in class self.variables
+        @param accumulator Optional FS3StatisticsAccumulator already fed with
+                           the string lengths, supplies the moment statistics
+        @param sortedColumn Optional cached FS3SortedColumn of the string
+                            lengths, supplies the median, mode and percentiles
         """
         # Check to ensure we are not passing an empty list
         if len(inputArray) < 1:
-            self.statName.append(QCoreApplication.translate("fs3characterstatistics", "Percentile"))
+            self.setSummary(None, percentileArray, originalSize)
             return
         # Start by converting the inputArray to a length array of the strings
-        tempArray = []
-        for string in inputArray:
-            tempArray.append(len(string))
-        inputArray = tempArray
+        lengthArray = None
+        if sortedColumn is None:
+            lengthArray = toLengthArray(inputArray)
+        summary = summarizeArray(lengthArray, percentileArray, accumulator, sortedColumn)
+        self.setSummary(summary, percentileArray, originalSize)
+
+    def setSummary(self, summary, percentileArray, originalSize):
+        """
+        setSummary
+        Stores an already computed summary of the string lengths
+        @param summary Dictionary from summarizeArray/summarizeCounts,
+                       None when the field has no filled values
+        @param percentileArray Array containing user selected percentiles
+        @param originalSize Number of items including empty cells
+        """
+        if summary is None:
+            self.statName.append(QCoreApplication.translate("fs3characterstatistics", "Percentile"))
+            return
         self.totalItemCount = originalSize
-        self.itemCount = itemCount(inputArray)
-        self.maxLength = maxValue(inputArray)
-        self.minLength = minValue(inputArray)
-        self.meanLength = meanValue(inputArray)
-        self.medianLength = medianValue(inputArray)
-        self.modeLength = modeValue(inputArray)
-        self.sumLength = sumValue(inputArray)
-        self.stdDevLength = stdDevValue(inputArray)
-        self.coeffVarLength = coeffVarValue(inputArray)
-        self.percentiles = percentileValues(inputArray, percentileArray)
+        self.itemCount = summary['itemCount']
+        self.maxLength = summary['maxValue']
+        self.minLength = summary['minValue']
+        self.meanLength = summary['meanValue']
+        self.medianLength = summary['medianValue']
+        self.modeLength = summary['modeValue']
+        self.sumLength = summary['sumValue']
+        self.stdDevLength = summary['stdDevValue']
+        self.coeffVarLength = summary['varianceValue']
+        self.percentiles = summary['percentiles']
+        self.percentileError = summary['percentileError']
         # 11 corresponds to our statistics + 2 extras generated by the table
         self.statCount = 11 + len(self.percentiles)
 
+        errorText = ''
+        if self.percentileError:
+            errorText = QCoreApplication.translate("fs3characterstatistics", " (approx. +/- {}% rank)")
+            errorText = errorText.format(decimalRound(self.percentileError * 100, 2))
+            self.statName[6] += errorText
         for percentileNumber in percentileArray:
-            self.statName.append(QCoreApplication.translate("fs3characterstatistics", "Percentile: ") + str(percentileNumber) + QCoreApplication.translate("fs3characterstatistics", " % (Length)"))
+            self.statName.append(QCoreApplication.translate("fs3characterstatistics", "Percentile: ") + str(percentileNumber) + QCoreApplication.translate("fs3characterstatistics", " % (Length)") + errorText)
 
     def roundCharacterStatistics(self, precision):
         """
@@ -209,6 +270,323 @@ class FS3CharacterStatistics(object):
         printString += str(self.coeffVarLength)
         return printString
 
+class FS3StatisticsAccumulator(object):
+    """
+    FS3StatisticsAccumulator
+    Moment based statistics of one field (count, null count, min/max, sum,
+    mean and variance). Values are added in chunks as the features are
+    read, memory use stays constant and the states of separate chunks
+    can be combined with merge
+    """
+
+    def __init__(self, sketch=None):
+        """
+        Variable definitions
+        @param sketch Optional FS3QuantileSketch filled with the same values
+        """
+        self.sketch = sketch
+        self.count = 0
+        self.nullCount = 0
+        self.maxValue = None
+        self.minValue = None
+        self.sumValue = 0
+        self.meanValue = 0.0
+        self.sumSquaredDiff = 0.0
+
+    @classmethod
+    def fromArray(cls, valueArray, sketch=None, nullCount=0):
+        """
+        fromArray
+        Builds the state of a whole numpy array in one vectorized pass
+        @param valueArray Numpy array without empty cells
+        @param sketch Optional FS3QuantileSketch to fill with the array
+        @param nullCount Number of empty cells left out of the array
+        @return accumulator FS3StatisticsAccumulator for the array
+        """
+        accumulator = cls(sketch=sketch)
+        accumulator.update(valueArray, nullCount)
+        return accumulator
+
+    @classmethod
+    def fromCounts(cls, valueCounts):
+        """
+        fromCounts
+        Builds the state of a value histogram without expanding it
+        @param valueCounts Dictionary of filled values to their occurrences
+        @return accumulator FS3StatisticsAccumulator for the histogram
+        """
+        accumulator = cls()
+        if len(valueCounts) < 1:
+            return accumulator
+        distinctArray = toNumericArray(list(valueCounts.keys()))
+        countArray = numpy.fromiter(valueCounts.values(), dtype=numpy.int64,
+                                    count=len(valueCounts))
+        accumulator.count = int(countArray.sum())
+        accumulator.maxValue = distinctArray.max().item()
+        accumulator.minValue = distinctArray.min().item()
+        if distinctArray.dtype.kind in 'iu':
+            # Python ints, the products may not fit in int64
+            accumulator.sumValue = sum(value * count for value, count
+                                       in zip(distinctArray.tolist(), countArray.tolist()))
+        else:
+            accumulator.sumValue = float(numpy.dot(distinctArray, countArray))
+        accumulator.meanValue = accumulator.sumValue / float(accumulator.count)
+        deviations = distinctArray - accumulator.meanValue
+        accumulator.sumSquaredDiff = float(numpy.dot(deviations * deviations, countArray))
+        return accumulator
+
+    def update(self, valueArray, nullCount=0):
+        """
+        update
+        Adds a chunk of values, such as the features read since the last
+        update. The chunk is summarized in one vectorized pass and combined
+        with the current state like merge does
+        @param valueArray Numpy array without empty cells
+        @param nullCount Number of empty cells left out of the chunk
+        @return self so updates can be chained
+        """
+        self.nullCount += nullCount
+        if self.sketch is not None:
+            self.sketch.extend(valueArray)
+        if len(valueArray) < 1:
+            return self
+        chunk = FS3StatisticsAccumulator()
+        chunk.count = len(valueArray)
+        chunk.maxValue = valueArray.max().item()
+        chunk.minValue = valueArray.min().item()
+        chunk.sumValue = exactSum(valueArray)
+        chunk.meanValue = chunk.sumValue / float(chunk.count)
+        deviations = valueArray - chunk.meanValue
+        chunk.sumSquaredDiff = float(numpy.dot(deviations, deviations))
+        return self.merge(chunk)
+
+    def merge(self, other):
+        """
+        merge
+        Combines the state of another accumulator into this one
+        Uses the pairwise update of Chan et al. for the variance
+        @param other FS3StatisticsAccumulator computed over other values
+        @return self so merges can be chained
+        """
+        self.nullCount += other.nullCount
+        if self.sketch is not None and other.sketch is not None:
+            self.sketch.merge(other.sketch)
+        if other.count < 1:
+            return self
+        if self.count < 1:
+            self.count = other.count
+            self.maxValue = other.maxValue
+            self.minValue = other.minValue
+            self.sumValue = other.sumValue
+            self.meanValue = other.meanValue
+            self.sumSquaredDiff = other.sumSquaredDiff
+            return self
+        total = self.count + other.count
+        delta = other.meanValue - self.meanValue
+        self.sumSquaredDiff += other.sumSquaredDiff + \
+                               delta * delta * self.count * other.count / total
+        self.count = total
+        self.maxValue = max(self.maxValue, other.maxValue)
+        self.minValue = min(self.minValue, other.minValue)
+        # The exact sum keeps the mean as precise as a single pass
+        self.sumValue += other.sumValue
+        self.meanValue = self.sumValue / float(total)
+        return self
+
+    def varianceValue(self):
+        """
+        varianceValue
+        @return The sample variance, 0 for less than two values
+        """
+        # Variance Requires a size of 2+
+        if self.count < 2:
+            return 0
+        return self.sumSquaredDiff / (self.count - 1)
+
+    def stdDevValue(self):
+        """
+        stdDevValue
+        @return The sample standard deviation, 0 for less than two values
+        """
+        return self.varianceValue() ** 0.5
+
+class FS3SortedColumn(object):
+    """
+    FS3SortedColumn
+    Sorted copy of one column, built once per data version
+    The median and mode are read while building, any set of percentiles
+    is then answered with direct lookups
+    """
+
+    def __init__(self, valueArray):
+        """
+        Variable definitions
+        @param valueArray Non-empty numpy array without empty cells
+        """
+        self.sortedArray = numpy.sort(valueArray)
+        count = len(self.sortedArray)
+        middle = count // 2
+        if count % 2:
+            self.medianValue = self.sortedArray[middle].item()
+        else:
+            self.medianValue = midpoint(self.sortedArray[middle - 1], self.sortedArray[middle])
+        self.modeValue = sortedMode(self.sortedArray)
+
+    def percentiles(self, percentileArray):
+        """
+        percentiles
+        @param percentileArray Array containing user selected percentiles
+        @return percentiles List of values, one per requested percentile
+        """
+        return sortedPercentiles(self.sortedArray, percentileArray)
+
+class FS3QuantileSketch(object):
+    """
+    FS3QuantileSketch
+    KLL quantile sketch used for the approximate percentile mode
+    Keeps a bounded number of items no matter how many values are added,
+    sketches built over separate chunks can be combined with merge
+    Every level is a numpy array, the levels above the lowest stay sorted
+    """
+
+    def __init__(self, k=200):
+        """
+        Variable definitions
+        @param k Accuracy parameter, memory grows linearly with k while the
+                 rank error shrinks roughly as 1/k
+        """
+        self.k = k
+        self.count = 0
+        self.size = 0
+        self.maxSize = 0
+        self.compactors = []
+        # Set from the first values, integers are sorted without conversion
+        self.dtype = numpy.float64
+        self.random = random.Random()
+        self.grow()
+
+    def capacity(self, level):
+        """
+        capacity
+        @param level Compactor level, 0 receives the raw values
+        @return Number of items the level holds before it is compacted
+        """
+        depth = len(self.compactors) - level - 1
+        return int(math.ceil(self.k * (2.0 / 3.0) ** depth)) + 1
+
+    def grow(self):
+        """
+        grow
+        Adds a compactor level on top of the existing ones
+        """
+        self.compactors.append(numpy.empty(0, dtype=self.dtype))
+        self.maxSize = sum(self.capacity(level) for level in range(len(self.compactors)))
+
+    def extend(self, values):
+        """
+        extend
+        Adds the values in batches of SKETCH_BATCH, every batch is
+        compacted at once, which never loses more rank than compacting
+        the same values in smaller groups
+        @param values Numpy array or list of filled (non NULL) values
+        """
+        values = numpy.asarray(values)
+        if values.dtype.kind not in 'iuf':
+            values = values.astype(numpy.float64)
+        if self.count == 0:
+            self.dtype = values.dtype
+            self.compactors = [items.astype(self.dtype) for items in self.compactors]
+        for start in range(0, len(values), SKETCH_BATCH):
+            batch = values[start:start + SKETCH_BATCH]
+            self.compactors[0] = numpy.concatenate((self.compactors[0], batch))
+            self.count += len(batch)
+            self.size += len(batch)
+            if self.size >= self.maxSize:
+                self.compress()
+
+    def compress(self):
+        """
+        compress
+        Halves the full levels from the bottom up, promoting every other
+        sorted item to the next level with twice the weight
+        """
+        while self.size >= self.maxSize:
+            for level in range(len(self.compactors)):
+                items = self.compactors[level]
+                if len(items) < self.capacity(level):
+                    continue
+                if level + 1 >= len(self.compactors):
+                    self.grow()
+                if level == 0:
+                    items = numpy.sort(items)
+                # An odd item out stays on this level
+                end = len(items) - len(items) % 2
+                promoted = items[self.random.randint(0, 1):end:2]
+                # Two sorted runs, the stable sort merges them in linear time
+                self.compactors[level + 1] = numpy.sort(
+                    numpy.concatenate((self.compactors[level + 1], promoted)), kind='stable')
+                self.compactors[level] = items[end:]
+            self.size = sum(len(items) for items in self.compactors)
+
+    def merge(self, other):
+        """
+        merge
+        Combines another sketch into this one, items keep the weight
+        of their level
+        @param other FS3QuantileSketch built over other values
+        @return self so merges can be chained
+        """
+        if other.count < 1:
+            return self
+        if self.count == 0:
+            self.dtype = other.dtype
+            self.compactors = [items.astype(self.dtype) for items in self.compactors]
+        while len(self.compactors) < len(other.compactors):
+            self.grow()
+        for level, items in enumerate(other.compactors):
+            merged = numpy.concatenate((self.compactors[level], items))
+            if level > 0:
+                merged = numpy.sort(merged, kind='stable')
+            self.compactors[level] = merged
+        self.count += other.count
+        self.size = sum(len(items) for items in self.compactors)
+        if self.size >= self.maxSize:
+            self.compress()
+        return self
+
+    def percentiles(self, percentileArray):
+        """
+        percentiles
+        Estimates several percentiles from the weighted items
+        Falls back to the exact interpolated result while nothing
+        has been compacted yet
+        @param percentileArray Array containing user selected percentiles
+        @return percentiles List of values, one per requested percentile
+        """
+        if self.count < 1 or len(percentileArray) < 1:
+            return []
+        if len(self.compactors) == 1:
+            return sortedPercentiles(numpy.sort(self.compactors[0]), percentileArray)
+        values = numpy.concatenate(self.compactors)
+        weights = numpy.concatenate([numpy.full(len(items), 2 ** level, dtype=numpy.int64)
+                                     for level, items in enumerate(self.compactors)])
+        order = numpy.argsort(values, kind='stable')
+        cumulative = numpy.cumsum(weights[order])
+        targets = numpy.asarray(percentileArray, dtype=numpy.float64) / 100 * cumulative[-1]
+        indexes = numpy.minimum(numpy.searchsorted(cumulative, targets), len(values) - 1)
+        return values[order][indexes].tolist()
+
+    def rankError(self):
+        """
+        rankError
+        Normalized rank error bound of the estimates (99% confidence)
+        Uses the empirical KLL fit published with Apache DataSketches
+        @return Error as a fraction of the item count, 0 while exact
+        """
+        if len(self.compactors) == 1:
+            return 0.0
+        return 2.296 / self.k ** 0.9723
+
 def removeEmptyCells(inputArray):
     """
     removeEmptyCells
@@ -223,6 +601,205 @@ def removeEmptyCells(inputArray):
             outputArray.append(string)
     return outputArray
 
+def toNumericArray(inputArray):
+    """
+    toNumericArray
+    Function used to convert a list of numbers to a typed numpy array once
+    Integer columns stay int64, everything else becomes float64
+    @param inputArray Array passed for calculation
+    @return valueArray numpy array holding the same values
+    """
+    valueArray = numpy.asarray(inputArray)
+    if valueArray.dtype.kind not in 'iuf':
+        valueArray = valueArray.astype(numpy.float64)
+    return valueArray
+
+def toLengthArray(inputArray):
+    """
+    toLengthArray
+    Function used to convert a list of strings to a numpy array of lengths
+    @param inputArray Array of strings without empty cells
+    @return lengthArray int64 numpy array of the string lengths
+    """
+    return numpy.fromiter((len(string) for string in inputArray),
+                          dtype=numpy.int64, count=len(inputArray))
+
+def summarizeArray(valueArray, percentileArray, accumulator=None, sortedColumn=None, mode=None):
+    """
+    summarizeArray
+    Function used to calculate every statistic of a numpy array in batch
+    The array is sorted a single time and the median, mode and percentiles
+    are all read from that sorted copy
+    @param valueArray Non-empty numpy array passed for calculation,
+                      may be None when sortedColumn, or the sketch and mode, are given
+    @param percentileArray Array containing user selected percentiles
+    @param accumulator Optional FS3StatisticsAccumulator holding the moment
+                       statistics of valueArray, computed here if missing
+    @param sortedColumn Optional cached FS3SortedColumn of valueArray
+    @param mode Optional already known mode of valueArray, used with the sketch
+    @return summary Dictionary of statistic names to values
+    """
+    if accumulator is not None and accumulator.sketch is not None:
+        # Approximate mode, order statistics come from the quantile sketch
+        sketch = accumulator.sketch
+        if mode is None and sortedColumn is not None:
+            mode = sortedColumn.modeValue
+        elif mode is None:
+            mode = modeValue(valueArray).item()
+        return {'itemCount': accumulator.count,
+                'maxValue': accumulator.maxValue,
+                'minValue': accumulator.minValue,
+                'meanValue': accumulator.meanValue,
+                'medianValue': sketch.percentiles([50])[0],
+                'modeValue': mode,
+                'sumValue': accumulator.sumValue,
+                'stdDevValue': accumulator.stdDevValue(),
+                'varianceValue': accumulator.varianceValue(),
+                'percentiles': sketch.percentiles(percentileArray),
+                'percentileError': sketch.rankError()}
+
+    if sortedColumn is None:
+        sortedColumn = FS3SortedColumn(valueArray)
+    if accumulator is None:
+        accumulator = FS3StatisticsAccumulator.fromArray(sortedColumn.sortedArray)
+
+    return {'itemCount': accumulator.count,
+            'maxValue': accumulator.maxValue,
+            'minValue': accumulator.minValue,
+            'meanValue': accumulator.meanValue,
+            'medianValue': sortedColumn.medianValue,
+            'modeValue': sortedColumn.modeValue,
+            'sumValue': accumulator.sumValue,
+            'stdDevValue': accumulator.stdDevValue(),
+            'varianceValue': accumulator.varianceValue(),
+            'percentiles': sortedColumn.percentiles(percentileArray),
+            'percentileError': None}
+
+def summarizeCounts(valueCounts, percentileArray, accumulator):
+    """
+    summarizeCounts
+    Function used to calculate every statistic from a value histogram
+    Gives the same results as summarizeArray on the expanded values,
+    used for the string lengths of an encoded text column
+    @param valueCounts Dictionary of filled values to their occurrences
+    @param percentileArray Array containing user selected percentiles
+    @param accumulator FS3StatisticsAccumulator over the same values
+    @return summary Dictionary of statistic names to values, None if empty
+    """
+    if len(valueCounts) < 1:
+        return None
+    distinctArray = toNumericArray(list(valueCounts.keys()))
+    countArray = numpy.fromiter(valueCounts.values(), dtype=numpy.int64,
+                                count=len(valueCounts))
+    order = numpy.argsort(distinctArray, kind='stable')
+    distinctArray = distinctArray[order]
+    countArray = countArray[order]
+    cumulativeCounts = numpy.cumsum(countArray)
+    count = int(cumulativeCounts[-1])
+
+    def orderStatistic(index):
+        """ Value at a position of the expanded sorted array """
+        return distinctArray[numpy.searchsorted(cumulativeCounts, index, side='right')]
+
+    if accumulator.sketch is not None:
+        median = accumulator.sketch.percentiles([50])[0]
+        percentiles = accumulator.sketch.percentiles(percentileArray)
+        percentileError = accumulator.sketch.rankError()
+    else:
+        middle = count // 2
+        if count % 2:
+            median = orderStatistic(middle).item()
+        else:
+            median = midpoint(orderStatistic(middle - 1), orderStatistic(middle))
+        percentiles = sortedPercentiles(distinctArray, percentileArray, cumulativeCounts)
+        percentileError = None
+
+    return {'itemCount': accumulator.count,
+            'maxValue': accumulator.maxValue,
+            'minValue': accumulator.minValue,
+            'meanValue': accumulator.meanValue,
+            'medianValue': median,
+            'modeValue': distinctArray[countArray.argmax()].item(),
+            'sumValue': accumulator.sumValue,
+            'stdDevValue': accumulator.stdDevValue(),
+            'varianceValue': accumulator.varianceValue(),
+            'percentiles': percentiles,
+            'percentileError': percentileError}
+
+def exactSum(valueArray):
+    """
+    exactSum
+    Function used to sum a numpy array without the silent int64 overflow
+    Integers are widened to 64 bits and summed exactly through their high
+    and low 32 bits, decimals are summed in float64
+    @param valueArray Numeric numpy array
+    @return Python int for integer arrays, float otherwise
+    """
+    if valueArray.dtype.kind in 'iu':
+        if valueArray.dtype != numpy.uint64:
+            valueArray = valueArray.astype(numpy.int64)
+        high = int((valueArray >> 32).sum())
+        low = int((valueArray & 0xFFFFFFFF).sum())
+        return high * 4294967296 + low
+    return float(valueArray.sum(dtype=numpy.float64))
+
+def midpoint(lower, upper):
+    """
+    midpoint
+    Function used to average two order statistics in float,
+    lower + upper could overflow for int64 values
+    @param lower Smaller value
+    @param upper Larger value
+    @return Value halfway between lower and upper
+    """
+    lower = float(lower)
+    return lower + (float(upper) - lower) / 2
+
+def sortedMode(sortedArray):
+    """
+    sortedMode
+    Function used to calculate the mode of an already sorted numpy array
+    Ties are resolved towards the smallest value
+    @param sortedArray Sorted, non-empty numpy array
+    @return The most common value
+    """
+    runStarts = numpy.flatnonzero(sortedArray[1:] != sortedArray[:-1]) + 1
+    runStarts = numpy.concatenate(([0], runStarts))
+    runLengths = numpy.diff(numpy.append(runStarts, len(sortedArray)))
+    return sortedArray[runStarts[runLengths.argmax()]].item()
+
+def sortedPercentiles(sortedArray, percentileArray, cumulativeCounts=None):
+    """
+    sortedPercentiles
+    Function used to read several percentiles from an already sorted array
+    Uses the same linear interpolation as numpy.percentile
+    @param sortedArray Sorted, non-empty numpy array
+    @param percentileArray Array containing user selected percentiles
+    @param cumulativeCounts Optional running occurrence counts when
+                            sortedArray only holds the distinct values
+    @return percentiles List of values, one per requested percentile
+    """
+    if len(percentileArray) < 1:
+        return []
+    if cumulativeCounts is None:
+        lastIndex = len(sortedArray) - 1
+    else:
+        lastIndex = int(cumulativeCounts[-1]) - 1
+    position = numpy.asarray(percentileArray, dtype=numpy.float64) / 100 * lastIndex
+    lower = numpy.floor(position).astype(numpy.intp)
+    upper = numpy.minimum(lower + 1, lastIndex)
+    fraction = position - lower
+    if cumulativeCounts is not None:
+        lower = numpy.searchsorted(cumulativeCounts, lower, side='right')
+        upper = numpy.searchsorted(cumulativeCounts, upper, side='right')
+    lowerValue = sortedArray[lower].astype(numpy.float64)
+    upperValue = sortedArray[upper].astype(numpy.float64)
+    difference = upperValue - lowerValue
+    percentiles = numpy.where(fraction >= 0.5,
+                              upperValue - difference * (1 - fraction),
+                              lowerValue + difference * fraction)
+    return percentiles.tolist()
+
 def itemCount(inputArray):
     """
     itemCount
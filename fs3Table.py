@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+"""
+
+    fs3Table.py -- Plugin implimentation of the data table model
+                -- For more information see : https://github.com/andreasfoulk/FS3
+
+    Copyright (c) 2018 Orden Aitchedji, McKenna Duzac, Andreas Foulk, Tanner Lee
+
+    This software may be modified and distributed under the terms
+    of the MIT license.  See the LICENSE file for details.
+
+"""
+
+import numpy
+from PyQt5.QtCore import Qt, QAbstractTableModel, QAbstractProxyModel, QModelIndex, pyqtSignal
+
+from .roundFunc import decimalRound
+from .fs3Columns import FS3EncodedColumn, sortOrder
+
+class FS3ColumnTableModel(QAbstractTableModel):
+    """
+    FS3ColumnTableModel
+    Serves the data table straight from the loaded column arrays
+    No item is created per cell, the view only asks for the cells
+    it shows and they are formatted at that moment
+    """
+    cellEdited = pyqtSignal(int, int, object)
+
+    def __init__(self, parent=None):
+        """ Variable definitions """
+        super(FS3ColumnTableModel, self).__init__(parent)
+        self.columnSet = None
+        self.columns = []
+        self.encodedColumns = []
+        self.fieldIndexes = []
+        self.precision = 0
+        # Text typed by the user, shown over the loaded values {(row, column):text}
+        self.editedCells = {}
+        # Encodings of the text columns sorted without a given one {column:FS3EncodedColumn}
+        self.sortEncodings = {}
+
+    def setColumns(self, columnSet, encodedColumns=None, fieldIndexes=None):
+        """
+        setColumns
+        Shows other columns, nothing is read or formatted here
+        @param columnSet FS3ColumnSet to show
+        @param encodedColumns FS3EncodedColumn of every text column, None
+                              for the other columns, used to sort text
+        @param fieldIndexes Layer field index of every column, used for the edits
+        """
+        self.beginResetModel()
+        self.columnSet = columnSet
+        self.columns = columnSet.columns if columnSet is not None else []
+        self.encodedColumns = encodedColumns or []
+        self.fieldIndexes = fieldIndexes or []
+        self.editedCells = {}
+        self.sortEncodings = {}
+        self.endResetModel()
+
+    def setPrecision(self, precision):
+        """
+        setPrecision
+        Changes the number of decimals shown, the visible cells are formatted again
+        @param precision User-selected number of decimals
+        """
+        if precision == self.precision:
+            return
+        self.precision = precision
+        if self.rowCount() > 0 and self.columnCount() > 0:
+            self.dataChanged.emit(self.index(0, 0),
+                                  self.index(self.rowCount() - 1, self.columnCount() - 1),
+                                  [Qt.DisplayRole, Qt.EditRole])
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid() or self.columnSet is None:
+            return 0
+        return self.columnSet.rowCount()
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.columns)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.columns[section].name
+        return str(section + 1)
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsEditable
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            return self.cellText(index.row(), index.column())
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        """
+        setData
+        Keeps the text typed by the user and reports it with cellEdited
+        """
+        if not index.isValid() or role != Qt.EditRole:
+            return False
+        self.editedCells[(index.row(), index.column())] = value
+        self.dataChanged.emit(index, index, [Qt.DisplayRole, Qt.EditRole])
+        self.cellEdited.emit(index.row(), index.column(), value)
+        return True
+
+    def cellFeature(self, row, column):
+        """
+        cellFeature
+        @param row Row of the cell
+        @param column Column of the cell
+        @return (feature id, field index) the cell was read from
+        """
+        return int(self.columnSet.featureIds[row]), self.fieldIndexes[column]
+
+    def cellValue(self, row, column):
+        """
+        cellValue
+        @param row Row of the cell
+        @param column Column of the cell
+        @return Python value of the cell, None if it is empty
+        """
+        fs3Column = self.columns[column]
+        if not fs3Column.valid[row]:
+            return None
+        value = fs3Column.values[row]
+        if fs3Column.numeric:
+            # Numpy scalar to int or float
+            value = value.item()
+        return value
+
+    def cellText(self, row, column):
+        """
+        cellText
+        @param row Row of the cell
+        @param column Column of the cell
+        @return Text shown in the cell, rounded to the selected decimals
+        """
+        edited = self.editedCells.get((row, column))
+        if edited is not None:
+            return str(edited)
+        value = self.cellValue(row, column)
+        if value is None:
+            return ""
+        if isinstance(value, float):
+            value = decimalRound(value, self.precision)
+        return str(value)
+
+    def sortKeys(self, column):
+        """
+        sortKeys
+        Typed keys a column is sorted on, numbers for numeric columns and
+        dictionary codes for the others, with the text that reads as a
+        number first, so the order is one numpy argsort
+        @param column Column to sort
+        @return (numeric numpy array of keys, bool numpy array of the filled cells)
+        """
+        fs3Column = self.columns[column]
+        if fs3Column.numeric:
+            return fs3Column.values, fs3Column.valid
+        encodedColumn = None
+        if column < len(self.encodedColumns):
+            encodedColumn = self.encodedColumns[column]
+        if encodedColumn is None:
+            encodedColumn = self.sortEncodings.get(column)
+        if encodedColumn is None:
+            encodedColumn = FS3EncodedColumn(fs3Column.toList(None))
+            self.sortEncodings[column] = encodedColumn
+        return encodedColumn.sortCodes(), encodedColumn.codes >= 0
+
+class FS3SortProxyModel(QAbstractProxyModel):
+    """
+    FS3SortProxyModel
+    Sorts the rows of a FS3ColumnTableModel through a row permutation
+    computed once per sort, the cells are never compared one by one
+    """
+
+    def __init__(self, parent=None):
+        """ Variable definitions """
+        super(FS3SortProxyModel, self).__init__(parent)
+        # Source row shown at every proxy row, None for the feature order
+        self.rowOrder = None
+        self.rowPosition = None
+        self.sortedColumn = -1
+        self.sortDirection = Qt.AscendingOrder
+
+    def setSourceModel(self, sourceModel):
+        """
+        setSourceModel
+        @param sourceModel FS3ColumnTableModel to sort
+        """
+        self.beginResetModel()
+        super(FS3SortProxyModel, self).setSourceModel(sourceModel)
+        sourceModel.modelAboutToBeReset.connect(self.beginResetModel)
+        sourceModel.modelReset.connect(self.handleSourceReset)
+        sourceModel.dataChanged.connect(self.handleSourceDataChanged)
+        self.endResetModel()
+
+    def handleSourceReset(self):
+        """
+        handleSourceReset
+        New columns are sorted like the previous ones
+        """
+        self.setRowOrder(self.sortedColumn, self.sortDirection)
+        self.endResetModel()
+
+    def handleSourceDataChanged(self, topLeft, bottomRight, roles=None):
+        """
+        handleSourceDataChanged
+        Forwards the changed cells, a range spanning several rows is
+        forwarded as the whole table since its rows are not contiguous anymore
+        """
+        if topLeft.row() == bottomRight.row():
+            self.dataChanged.emit(self.mapFromSource(topLeft),
+                                  self.mapFromSource(bottomRight), roles or [])
+        else:
+            self.dataChanged.emit(self.index(0, topLeft.column()),
+                                  self.index(self.rowCount() - 1, bottomRight.column()),
+                                  roles or [])
+
+    def index(self, row, column, parent=QModelIndex()):
+        if parent.isValid() or row < 0 or column < 0 or \
+           row >= self.rowCount() or column >= self.columnCount():
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=None):
+        return QModelIndex()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid() or self.sourceModel() is None:
+            return 0
+        return self.sourceModel().rowCount()
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid() or self.sourceModel() is None:
+            return 0
+        return self.sourceModel().columnCount()
+
+    def mapToSource(self, proxyIndex):
+        if not proxyIndex.isValid():
+            return QModelIndex()
+        row = proxyIndex.row()
+        if self.rowOrder is not None:
+            row = int(self.rowOrder[row])
+        return self.sourceModel().index(row, proxyIndex.column())
+
+    def mapFromSource(self, sourceIndex):
+        if not sourceIndex.isValid():
+            return QModelIndex()
+        row = sourceIndex.row()
+        if self.rowPosition is not None:
+            row = int(self.rowPosition[row])
+        return self.index(row, sourceIndex.column())
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        """
+        sort
+        Sorts the rows on the typed keys of a column, a negative
+        column restores the feature order
+        @param column Column to sort on
+        @param order Qt.AscendingOrder or Qt.DescendingOrder
+        """
+        sourceModel = self.sourceModel()
+        if sourceModel is None or column >= sourceModel.columnCount():
+            return
+        self.layoutAboutToBeChanged.emit()
+        persistentIndexes = self.persistentIndexList()
+        sourceIndexes = [self.mapToSource(index) for index in persistentIndexes]
+
+        self.setRowOrder(column, order)
+
+        self.changePersistentIndexList(persistentIndexes,
+                                       [self.mapFromSource(index) for index in sourceIndexes])
+        self.layoutChanged.emit()
+
+    def setRowOrder(self, column, order):
+        """
+        setRowOrder
+        Computes the row permutation of a sort
+        @param column Column to sort on, negative for the feature order
+        @param order Qt.AscendingOrder or Qt.DescendingOrder
+        """
+        self.sortedColumn = column
+        self.sortDirection = order
+        sourceModel = self.sourceModel()
+        if column < 0 or column >= sourceModel.columnCount():
+            self.rowOrder = None
+            self.rowPosition = None
+            return
+        keys, valid = sourceModel.sortKeys(column)
+        self.rowOrder = sortOrder(keys, valid, order == Qt.DescendingOrder)
+        self.rowPosition = numpy.empty_like(self.rowOrder)
+        self.rowPosition[self.rowOrder] = numpy.arange(len(self.rowOrder))
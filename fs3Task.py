@@ -0,0 +1,527 @@
+# -*- coding: utf-8 -*-
+"""
+
+    fs3Task.py -- Plugin implimentation loading and computing the tabs in the background
+               -- For more information see : https://github.com/andreasfoulk/FS3
+
+    Copyright (c) 2018 Orden Aitchedji, McKenna Duzac, Andreas Foulk, Tanner Lee
+
+    This software may be modified and distributed under the terms
+    of the MIT license.  See the LICENSE file for details.
+
+"""
+
+import copy
+
+import numpy
+from PyQt5.QtCore import pyqtSignal, QCoreApplication
+
+from qgis.core import QgsTask, QgsFeedback, QgsVectorLayerFeatureSource
+
+from .fs3Stats import FS3NumericalStatistics, FS3CharacterStatistics, summarizeArray, summarizeCounts
+from .fs3Stats import sortedMode
+from .fs3Stats import FS3StatisticsAccumulator, FS3QuantileSketch, FS3SortedColumn
+from .fs3Columns import FS3ColumnSet, FS3EncodedColumn, columnRequest, readColumns
+from .fs3Unique import FS3Uniqueness, SUMMARY_THRESHOLD
+from .fs3Unique import distinctCounts, countArray, topArrayValues
+
+# Share of the task progress spent reading the features
+LOAD_PROGRESS = 50.0
+
+class FS3RefreshSettings(object):
+    """
+    FS3RefreshSettings
+    Snapshot of the user interface state a refresh is computed for,
+    read on the GUI thread before the task starts
+    """
+
+    def __init__(self):
+        """ Variable definitions """
+        self.fields = []
+        self.loadedFields = []
+        self.allFields = False
+        # Field graphed on the x-axis, read with the fields but not summarized
+        self.xAxisField = None
+        self.limitToSelected = False
+        self.percentileArray = []
+        self.approximate = False
+        self.precision = 0
+        self.topK = None
+        self.summaryTopK = 100
+        # FS3ColumnCache shared with the main window
+        self.columnCache = None
+        # (layer id, limited to selection), start of every cache key
+        self.cacheKey = ()
+        self.dataVersion = 0
+
+    def fetchKey(self):
+        """
+        fetchKey
+        @return Tuple equal for two settings reading the same raw values
+        """
+        return (tuple(self.loadedFields), self.cacheKey, self.dataVersion)
+
+    def computeKey(self):
+        """
+        computeKey
+        The percentiles and the decimals are left out, they are applied
+        to a finished result without running the task again
+        @return Tuple equal for two settings that compute the same result
+        """
+        return self.fetchKey() + (tuple(self.fields), self.allFields, self.xAxisField,
+                                  self.approximate, self.topK, self.summaryTopK)
+
+class FS3FieldSummary(object):
+    """
+    FS3FieldSummary
+    Everything the statistics of one field are read from, kept with the
+    result so other percentiles are answered without touching the values
+    """
+
+    def __init__(self, size, numeric):
+        """
+        Variable definitions
+        @param size Number of items including empty cells
+        @param numeric True for a numeric field, False for a text field
+        """
+        self.size = size
+        self.numeric = numeric
+        self.lengthCounts = {}
+        self.accumulator = None
+        self.sortedColumn = None
+        self.modeValue = None
+
+    def statistics(self, percentileArray):
+        """
+        statistics
+        @param percentileArray Array containing user selected percentiles
+        @return FS3NumericalStatistics or FS3CharacterStatistics, not rounded
+        """
+        if self.numeric:
+            summary = None
+            if self.accumulator is not None:
+                summary = summarizeArray(None, percentileArray, self.accumulator,
+                                         self.sortedColumn, self.modeValue)
+            numericalStatistics = FS3NumericalStatistics()
+            numericalStatistics.setSummary(summary, percentileArray, self.size)
+            return numericalStatistics
+        summary = summarizeCounts(self.lengthCounts, percentileArray, self.accumulator)
+        characterStatistics = FS3CharacterStatistics()
+        characterStatistics.setSummary(summary, percentileArray, self.size)
+        return characterStatistics
+
+class FS3RefreshResult(object):
+    """
+    FS3RefreshResult
+    Everything a refresh computed, handed back to the GUI thread
+    Nothing is rounded, the decimals are only applied for display
+    """
+
+    def __init__(self, settings, columnSet):
+        """
+        Variable definitions
+        @param settings FS3RefreshSettings the result was computed for
+        @param columnSet FS3ColumnSet as read from the layer
+        """
+        self.settings = settings
+        self.columnSet = columnSet
+        # FS3Column of the x-axis field, None if the graph uses the row numbers
+        self.xColumn = None
+        self.summaries = []
+        self.encodedColumns = []
+        self.percentileArray = []
+        self.statistics = []
+        self.uniqueness = None
+
+    def setPercentiles(self, percentileArray):
+        """
+        setPercentiles
+        Recomputes the statistics from the field summaries
+        @param percentileArray Array containing user selected percentiles
+        """
+        self.percentileArray = list(percentileArray)
+        self.statistics = [summary.statistics(self.percentileArray)
+                           for summary in self.summaries]
+
+    def roundedStatistics(self, precision):
+        """
+        roundedStatistics
+        @param precision User-selected number of decimals to round to
+        @return Rounded copies of the statistics
+        """
+        roundedStatistics = []
+        for statistics in self.statistics:
+            statistics = copy.copy(statistics)
+            if isinstance(statistics, FS3NumericalStatistics):
+                statistics.roundNumericStatistics(precision)
+            else:
+                statistics.roundCharacterStatistics(precision)
+            roundedStatistics.append(statistics)
+        return roundedStatistics
+
+    def roundedUniqueness(self, precision):
+        """
+        roundedUniqueness
+        @param precision User-selected number of decimals to round to
+        @return Rounded copy of the uniqueness
+        """
+        uniqueness = copy.copy(self.uniqueness)
+        uniqueness.roundUniqueness(precision)
+        return uniqueness
+
+class FS3RefreshTask(QgsTask):
+    """
+    FS3RefreshTask
+    Reads the selected fields and computes the statistics and uniqueness
+    outside the GUI thread. The layer is only touched in the constructor,
+    the features are read from a thread safe feature source
+    """
+    resultReady = pyqtSignal(object)
+    distinctEstimated = pyqtSignal(int, int, bool)
+
+    def __init__(self, layer, settings):
+        """
+        Variable definitions, must be called on the GUI thread
+        The layer is not read when every field is found in the cache,
+        otherwise all fields are read again in a single pass
+        @param layer QgsVectorLayer to read
+        @param settings FS3RefreshSettings to compute
+        """
+        super(FS3RefreshTask, self).__init__(QCoreApplication.translate("FS3RefreshTask", "FS3 statistics"),
+                                             QgsTask.CanCancel)
+        self.settings = settings
+        self.result = None
+        self.feedback = QgsFeedback()
+        self.feedback.progressChanged.connect(self.loadProgressChanged)
+
+        cache = settings.columnCache
+        self.generation = cache.generation(layer.id())
+        self.cachedFeatureIds = cache.get(settings.cacheKey + ('featureIds',))
+        self.cachedColumnSet = None
+        if self.cachedFeatureIds is not None:
+            columns = [cache.get(settings.cacheKey + ('column', field))
+                       for field in settings.loadedFields]
+            if all(column is not None for column in columns):
+                self.cachedColumnSet = FS3ColumnSet(self.cachedFeatureIds, columns)
+        # Columns read by run, stored in the cache once finished
+        self.loadedColumnSet = None
+        self.cacheOutdated = False
+        # Distinct counts of the numeric fields, shared within one refresh
+        self.distinctCounts = {}
+        if self.cachedColumnSet is not None:
+            return
+
+        self.fields = layer.fields()
+        self.request, self.fieldIndexes = columnRequest(layer, settings.loadedFields,
+                                                        settings.limitToSelected)
+        if settings.limitToSelected and layer.selectedFeatureCount() > 0:
+            self.expectedCount = layer.selectedFeatureCount()
+        else:
+            self.expectedCount = layer.featureCount()
+        self.source = QgsVectorLayerFeatureSource(layer)
+
+    def loadProgressChanged(self, progress):
+        """
+        loadProgressChanged
+        @param progress Percentage of the features read
+        """
+        self.setProgress(progress * LOAD_PROGRESS / 100.0)
+
+    def cancel(self):
+        """
+        cancel
+        Also stops the feature reading loop
+        """
+        self.feedback.cancel()
+        super(FS3RefreshTask, self).cancel()
+
+    def run(self):
+        """
+        run
+        Runs in the background thread
+        @return True if the result is complete
+        """
+        columnSet = self.getColumnSet()
+        if columnSet is None or self.isCanceled():
+            return False
+        self.setProgress(LOAD_PROGRESS)
+
+        xColumn = None
+        if self.settings.xAxisField is not None:
+            xColumn = columnSet.columns[self.settings.loadedFields.index(self.settings.xAxisField)]
+            # A x-axis field that is not selected is only graphed
+            columnSet = FS3ColumnSet(columnSet.featureIds, columnSet.columns[:len(self.settings.fields)])
+
+        # Empty cells stay flagged in the validity masks
+        # instead of being compared against NULL
+        columns = columnSet.columns
+        result = FS3RefreshResult(self.settings, columnSet)
+        result.xColumn = xColumn
+        if self.settings.allFields:
+            self.result = result
+            return True
+
+        fields = self.settings.fields
+        for i in range(len(fields)):
+            column = columns[i]
+            encodedColumn = None
+            if column.numeric:
+                #Summarize numeric values
+                result.summaries.append(self.createNumericalSummary(column, fields[i]))
+            else:
+                #Summarize string lengths
+                encodedColumn = self.getEncodedColumn(fields[i], column)
+                result.summaries.append(self.createCharacterSummary(encodedColumn))
+            result.encodedColumns.append(encodedColumn)
+            if self.isCanceled():
+                return False
+            self.setProgress(LOAD_PROGRESS + (100.0 - LOAD_PROGRESS) * (i + 1) / (len(fields) + 1))
+        result.setPercentiles(self.settings.percentileArray)
+
+        if len(fields) == 1 and result.encodedColumns[0] is not None:
+            result.uniqueness = self.createUniquenessFromEncoded(result.encodedColumns[0])
+        else:
+            result.uniqueness = self.createUniqueness(columns)
+        if self.isCanceled():
+            return False
+        self.result = result
+        return True
+
+    def getColumnSet(self):
+        """
+        getColumnSet
+        Returns the cached columns, or reads every loaded field in one pass
+        @return FS3ColumnSet of the loaded fields, None if canceled
+        """
+        if self.cachedColumnSet is not None:
+            return self.cachedColumnSet
+
+        columnSet = readColumns(self.source, self.fields, self.fieldIndexes,
+                                self.request, self.feedback, self.expectedCount)
+        if columnSet is None:
+            return None
+        if self.cachedFeatureIds is not None and \
+           not numpy.array_equal(self.cachedFeatureIds, columnSet.featureIds):
+            # The columns of other fields cached for these rows are outdated
+            self.cacheOutdated = True
+        self.loadedColumnSet = columnSet
+        return columnSet
+
+    def finished(self, result):
+        """
+        finished
+        Runs on the GUI thread once run returned, the columns read
+        from the layer are kept in the cache
+        @param result Value returned by run
+        """
+        if result and self.loadedColumnSet is not None:
+            self.cacheColumns(self.loadedColumnSet)
+        if result and not self.isCanceled():
+            self.resultReady.emit(self.result)
+
+    def cacheColumns(self, columnSet):
+        """
+        cacheColumns
+        @param columnSet FS3ColumnSet read by run
+        """
+        cache = self.settings.columnCache
+        cacheKey = self.settings.cacheKey
+        generation = self.generation
+        if self.cacheOutdated:
+            cache.invalidateLayer(cacheKey[0], cacheKey[1])
+            generation = cache.generation(cacheKey[0])
+        cache.put(cacheKey + ('featureIds',), columnSet.featureIds, generation)
+        for column in columnSet.columns:
+            cache.put(cacheKey + ('column', column.name), column, generation)
+
+    def getSortedColumn(self, field, valueArray):
+        """
+        getSortedColumn
+        Returns the sorted column of a field, sorting it only once per cached column
+        @param field Name of the field
+        @param valueArray Numpy array of the filled values of the field
+        @return sortedColumn FS3SortedColumn, None for an empty field
+        """
+        if len(valueArray) < 1:
+            return None
+        if self.cacheOutdated:
+            # Entries cached for the previous rows are not used or kept
+            return FS3SortedColumn(valueArray)
+        key = self.settings.cacheKey + ('sorted', field)
+        sortedColumn = self.settings.columnCache.get(key)
+        if sortedColumn is None:
+            sortedColumn = FS3SortedColumn(valueArray)
+            self.settings.columnCache.put(key, sortedColumn, self.generation)
+        return sortedColumn
+
+    def getQuantileSketch(self, field, valueArray):
+        """
+        getQuantileSketch
+        Returns the quantile sketch of a field, filling it only once per cached column
+        @param field Name of the field
+        @param valueArray Numpy array of the filled values of the field
+        @return sketch FS3QuantileSketch
+        """
+        if self.cacheOutdated:
+            sketch = FS3QuantileSketch()
+            sketch.extend(valueArray)
+            return sketch
+        key = self.settings.cacheKey + ('sketch', field)
+        sketch = self.settings.columnCache.get(key)
+        if sketch is None:
+            sketch = FS3QuantileSketch()
+            sketch.extend(valueArray)
+            self.settings.columnCache.put(key, sketch, self.generation)
+        return sketch
+
+    def getModeValue(self, field, column):
+        """
+        getModeValue
+        Returns the mode of a numeric field, found only once per cached column
+        It is read from the sorted column when the exact mode built one,
+        from the distinct counts the uniqueness also uses for a single
+        field, or else from one sort of the filled values
+        @param field Name of the field
+        @param column FS3Column of the field
+        @return The most common value
+        """
+        cache = self.settings.columnCache
+        if not self.cacheOutdated:
+            mode = cache.get(self.settings.cacheKey + ('mode', field))
+            if mode is not None:
+                return mode
+            sortedColumn = cache.get(self.settings.cacheKey + ('sorted', field))
+            if sortedColumn is not None:
+                return sortedColumn.modeValue
+        if len(self.settings.fields) == 1:
+            distinct, counts, firstPositions = self.getDistinctCounts(field, column)
+            mode = distinct[counts.argmax()].item()
+        else:
+            mode = sortedMode(numpy.sort(column.filledValues()))
+        if not self.cacheOutdated:
+            cache.put(self.settings.cacheKey + ('mode', field), mode, self.generation)
+        return mode
+
+    def getEncodedColumn(self, field, column):
+        """
+        getEncodedColumn
+        Returns the dictionary encoded column of a text field,
+        encoding it only once per cached column
+        @param field Name of the field
+        @param column FS3Column of the field
+        @return encodedColumn FS3EncodedColumn
+        """
+        if self.cacheOutdated:
+            return FS3EncodedColumn(column.toList(None))
+        key = self.settings.cacheKey + ('encoded', field)
+        encodedColumn = self.settings.columnCache.get(key)
+        if encodedColumn is None:
+            encodedColumn = FS3EncodedColumn(column.toList(None))
+            self.settings.columnCache.put(key, encodedColumn, self.generation)
+        return encodedColumn
+
+    def getDistinctCounts(self, field, column):
+        """
+        getDistinctCounts
+        Returns the distinct values of a numeric field with their occurrences,
+        counted only once per refresh for the mode and the uniqueness
+        @param field Name of the field
+        @param column FS3Column of the field
+        @return Result of distinctCounts for the column
+        """
+        counted = self.distinctCounts.get(field)
+        if counted is None:
+            counted = distinctCounts(column.values, column.valid)
+            self.distinctCounts[field] = counted
+        return counted
+
+    def createNumericalSummary(self, column, field):
+        """
+        createNumericalSummary
+        Computes everything the numerical statistics of a field are read from
+        Only the sketch, or the cached sorted column, is kept with the summary
+        @param column FS3Column of the field that statistics should be run on
+        @param field Name of the field
+        @return summary FS3FieldSummary of the field
+        """
+        summary = FS3FieldSummary(len(column), True)
+        filledValues = column.filledValues()
+        if len(filledValues) < 1:
+            return summary
+        if self.settings.approximate:
+            # The moments were accumulated while reading, only the sketch is added
+            summary.accumulator = copy.copy(column.accumulator)
+            summary.accumulator.sketch = self.getQuantileSketch(field, filledValues)
+            summary.modeValue = self.getModeValue(field, column)
+        else:
+            summary.accumulator = column.accumulator
+            summary.sortedColumn = self.getSortedColumn(field, filledValues)
+        return summary
+
+    def createCharacterSummary(self, encodedColumn):
+        """
+        createCharacterSummary
+        Computes everything the character statistics of a field are read from
+        The string lengths are read once per dictionary entry, the exact
+        statistics come from the resulting length histogram
+        @param encodedColumn FS3EncodedColumn of the selected field
+        @return summary FS3FieldSummary of the field
+        """
+        summary = FS3FieldSummary(len(encodedColumn.codes), False)
+        summary.lengthCounts = encodedColumn.lengthCounts()
+        summary.accumulator = FS3StatisticsAccumulator.fromCounts(summary.lengthCounts)
+        return summary
+
+    def createUniqueness(self, columns):
+        """
+        createUniqueness
+        Method that instantiates Uniqueness class and initializes it
+        Fields with too many distinct values are summarised to their top values
+        A single numeric field is counted exactly with numpy, the rows of
+        several fields are counted in a single pass that also estimates
+        their distinct count once they have to be summarised
+        @param columns FS3Column of the selected field(s) that uniqueness should be run on
+        @return uniqueness FS3Uniqueness object with calculated uniqueness
+        """
+        topK = self.settings.topK
+        uniqueness = FS3Uniqueness()
+        if len(columns) == 1 and columns[0].values.dtype.kind in 'iuf':
+            # Same counts the approximate mode was taken from
+            column = columns[0]
+            counted = self.getDistinctCounts(column.name, column)
+            distinctCount = len(counted[0]) + int(not column.valid.all())
+            if topK is None and distinctCount > SUMMARY_THRESHOLD:
+                topK = self.settings.summaryTopK
+            # Publish the distinct count before the table is built
+            self.distinctEstimated.emit(distinctCount, topK or 0, True)
+            uniqueness.distinctEstimate = distinctCount
+            uniqueness.distinctExact = True
+            if topK is not None and distinctCount > topK:
+                uniqueness.setTopValues(topArrayValues(column.values, column.valid,
+                                                       topK, counted), len(column))
+            else:
+                uniqueness.initializeFromCounts(countArray(column.values, column.valid, counted))
+            return uniqueness
+        uniqueness.initializeFromColumns(columns, topK, self.settings.summaryTopK)
+        if topK is None and not uniqueness.distinctExact:
+            topK = self.settings.summaryTopK
+        self.distinctEstimated.emit(uniqueness.distinctEstimate, topK or 0,
+                                    uniqueness.distinctExact)
+        return uniqueness
+
+    def createUniquenessFromEncoded(self, encodedColumn):
+        """
+        createUniquenessFromEncoded
+        Method that instantiates Uniqueness from the code counts of a text field
+        The distinct count is exact, no estimate is needed
+        @param encodedColumn FS3EncodedColumn of the selected field
+        @return uniqueness FS3Uniqueness object with calculated uniqueness
+        """
+        topK = self.settings.topK
+        if topK is None and encodedColumn.distinctCount() > SUMMARY_THRESHOLD:
+            topK = self.settings.summaryTopK
+        uniqueness = FS3Uniqueness()
+        uniqueness.distinctEstimate = encodedColumn.distinctCount()
+        uniqueness.distinctExact = True
+        uniqueness.initializeFromCounts(encodedColumn.valueCounts(), topK)
+        return uniqueness
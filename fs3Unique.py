@@ -11,10 +11,19 @@
 
 """
 
+import heapq
+import math
+from operator import itemgetter
+
+import numpy
+
 from qgis.core import NULL
 from .roundFunc import decimalRound
 from PyQt5.QtCore import QCoreApplication
 
+# Above this many distinct values the unique table switches to the top-K mode
+SUMMARY_THRESHOLD = 100000
+
 class FS3Uniqueness(object):
     """
     FS3Uniqueness
@@ -31,37 +40,169 @@ class FS3Uniqueness(object):
                          QCoreApplication.translate("FS3Uniqueness", "Percentage (%)")]
         self.statCount = 3
         self.numItems = 0
+        # Only set in top-K mode, occurrences possibly missing from every count
+        self.countErrors = None
+        # Number of distinct values, a HyperLogLog estimate unless distinctExact
+        self.distinctEstimate = None
+        self.distinctExact = False
 
-    def initialize(self, inputArray):
+    def initialize(self, inputArray, topK=None):
         """
         initialize
         @param inputArray Array of data to be analyzed
+        @param topK Optional number of most frequent values to report,
+                    counted in fixed memory with a Space-Saving summary
         """
         if len(inputArray) > 1:
             inputArray = self.multiListHandler(inputArray)
         else:
             inputArray = inputArray[0]
 
-        self.numItems = len(inputArray)
-        self.uniqueValues = uniqueValues(inputArray)
-        self.uniqueNumOccur = uniqueNumberOccurances(self.uniqueValues, inputArray)
-        self.uniquePercent = uniquePercent(self.uniqueNumOccur, self.numItems)
-        self.totalValues = len(self.uniqueValues)
+        if topK is None:
+            self.initializeFromCounts(countValues(inputArray))
+            return
+        summary = FS3SpaceSaving(topK)
+        for value in inputArray:
+            summary.update(None if value == NULL else value)
+        self.setTopValues(summary.topValues(), summary.total, summary.errors)
+
+    def initializeFromColumns(self, columns, topK=None, summaryTopK=None):
+        """
+        initializeFromColumns
+        Same as initialize for loaded columns, the empty cells
+        are read from their validity masks
+        Without topK the rows are counted exactly until more than
+        SUMMARY_THRESHOLD distinct rows are found, the rest of the rows then
+        go to a Space-Saving summary seeded with these counts. Once the rows
+        are summarised their distinct count is estimated in the same pass
+        @param columns List of FS3Column of the selected fields
+        @param topK Optional number of most frequent values to report
+        @param summaryTopK Number of values reported past the threshold,
+                           None to always count exactly
+        """
+        if topK is None and summaryTopK is None:
+            valueCounts = countColumns(columns)
+            self.distinctEstimate = len(valueCounts)
+            self.distinctExact = True
+            self.initializeFromCounts(valueCounts)
+            return
+        keys = iter(columnKeys(columns))
+        distinctSketch = FS3HyperLogLog()
+        if topK is None:
+            valueCounts = {}
+            for key in keys:
+                valueCounts[key] = valueCounts.get(key, 0) + 1
+                if len(valueCounts) > SUMMARY_THRESHOLD:
+                    break
+            else:
+                self.distinctEstimate = len(valueCounts)
+                self.distinctExact = True
+                self.initializeFromCounts(valueCounts)
+                return
+            summary = FS3SpaceSaving.fromCounts(summaryTopK, valueCounts)
+            for key in valueCounts:
+                distinctSketch.update(key)
+        else:
+            summary = FS3SpaceSaving(topK)
+        for key in keys:
+            distinctSketch.update(key)
+            summary.update(key)
+        self.distinctEstimate = distinctSketch.estimate()
+        self.setTopValues(summary.topValues(), summary.total, summary.errors)
 
     def multiListHandler(self, inputArray):
         """
         multiListHandler
         Handles the instance where inputArray has more than one list
+        Rows are keyed by tuples, they are only formatted for display
         @param inputArray Array of Lists to be merged
-        @return returnArray Array of zipped lists
+        @return Iterator of one tuple per row, None standing for NULL
+        """
+        columns = []
+        for column in inputArray:
+            columns.append([None if value == NULL else value for value in column])
+        return zip(*columns)
+
+    def initializeFromCounts(self, valueCounts, topK=None):
         """
-        returnArray = []
-        for j in range(len(inputArray[0])):
-            returnArray.append('[')
-            for i in range(len(inputArray)):
-                returnArray[j] += str(inputArray[i][j]) + '] , ['
-            returnArray[j] = returnArray[j][:-4]
-        return returnArray
+        initializeFromCounts
+        Fills the uniqueness from already counted values
+        Used for the code counts of an encoded text column
+        @param valueCounts Dictionary of values (None for NULL) to their
+                           occurrences, in order of first appearance
+        @param topK Optional number of most frequent values to report
+        """
+        if topK is not None and len(valueCounts) > topK:
+            topValues = heapq.nlargest(topK, valueCounts.items(), key=itemgetter(1))
+            self.setTopValues(topValues, sum(valueCounts.values()))
+            return
+        self.numItems = sum(valueCounts.values())
+        self.uniqueValues = []
+        for value in valueCounts:
+            if value is None:
+                self.uniqueValues.append(QCoreApplication.translate("FS3Uniqueness", "NULL (Empty)"))
+            else:
+                self.uniqueValues.append(value)
+        self.uniqueNumOccur = list(valueCounts.values())
+        self.uniquePercent = uniquePercent(self.uniqueNumOccur, self.numItems)
+        self.totalValues = len(self.uniqueValues)
+
+    def setTopValues(self, topValues, numItems, countErrors=None):
+        """
+        setTopValues
+        Fills the uniqueness with the most frequent values only,
+        every other value is summed in a single "Other" entry
+        @param topValues List of (value, count) sorted by decreasing count
+        @param numItems Total number of items in the original array
+        @param countErrors Optional dictionary of values to the number of
+                           occurrences that may be missing from their count
+        """
+        self.numItems = numItems
+        self.uniqueValues = []
+        self.uniqueNumOccur = []
+        self.countErrors = []
+        for value, count in topValues:
+            if value is None:
+                self.uniqueValues.append(QCoreApplication.translate("FS3Uniqueness", "NULL (Empty)"))
+            else:
+                self.uniqueValues.append(value)
+            self.uniqueNumOccur.append(count)
+            self.countErrors.append(countErrors[value] if countErrors else 0)
+        otherCount = numItems - sum(self.uniqueNumOccur)
+        if otherCount > 0:
+            self.uniqueValues.append(QCoreApplication.translate("FS3Uniqueness", "Other (Remaining Values)"))
+            self.uniqueNumOccur.append(otherCount)
+            # Missing occurrences of the top values are counted in this
+            # entry, its error is not an undercount and is left empty
+            self.countErrors.append(None)
+        self.uniquePercent = uniquePercent(self.uniqueNumOccur, self.numItems)
+        self.totalValues = len(self.uniqueValues)
+        self.statName.append(QCoreApplication.translate("FS3Uniqueness", "Count Error (+)"))
+        self.statCount = 4
+
+    def displayErrors(self):
+        """
+        displayErrors
+        Formats the count errors of the top-K mode for the unique table
+        @return List of strings, empty when the counts are exact
+        """
+        if self.countErrors is None:
+            return []
+        return ['' if error is None else str(error) for error in self.countErrors]
+
+    def displayValues(self):
+        """
+        displayValues
+        Formats the unique values for the unique table and pie chart
+        @return List of strings, multi field rows as [value1] , [value2]
+        """
+        displayList = []
+        for value in self.uniqueValues:
+            if isinstance(value, tuple):
+                displayList.append(combineValues(value))
+            else:
+                displayList.append(str(value))
+        return displayList
 
     def roundUniqueness(self, precision):
         """
@@ -76,6 +217,302 @@ class FS3Uniqueness(object):
 
 
 
+class FS3SpaceSaving(object):
+    """
+    FS3SpaceSaving
+    Space-Saving summary of the most frequent values of a stream
+    Holds at most capacity counters, every value occurring more than
+    total / capacity times is guaranteed to be kept, and every kept
+    count is known up to its recorded error
+    """
+
+    def __init__(self, capacity):
+        """
+        Variable definitions
+        @param capacity Number of values the summary keeps track of
+        """
+        self.capacity = capacity
+        self.total = 0
+        self.counts = {}
+        self.errors = {}
+        # Min-heap of (count, insertion, value), counts may lag behind
+        self.heap = []
+        self.insertions = 0
+
+    @classmethod
+    def fromCounts(cls, capacity, valueCounts):
+        """
+        fromCounts
+        Summary continuing from exact counts, the most frequent values are
+        kept without error. Every dropped value was counted at most the
+        smallest kept count, so the error bounds still hold
+        @param capacity Number of values the summary keeps track of
+        @param valueCounts Dictionary of values to their exact occurrences
+        @return FS3SpaceSaving
+        """
+        summary = cls(capacity)
+        summary.total = sum(valueCounts.values())
+        for value, count in heapq.nlargest(capacity, valueCounts.items(), key=itemgetter(1)):
+            summary.counts[value] = count
+            summary.errors[value] = 0
+            summary.push(count, value)
+        return summary
+
+    def update(self, value):
+        """
+        update
+        Counts one occurrence of a value
+        @param value Hashable value, None for NULL
+        """
+        self.total += 1
+        if value in self.counts:
+            self.counts[value] += 1
+            return
+        if len(self.counts) < self.capacity:
+            self.counts[value] = 1
+            self.errors[value] = 0
+            self.push(1, value)
+            return
+        # Replace the smallest counter, its count becomes the error
+        minimum, evicted = self.popMinimum()
+        del self.counts[evicted]
+        del self.errors[evicted]
+        self.counts[value] = minimum + 1
+        self.errors[value] = minimum
+        self.push(minimum + 1, value)
+
+    def push(self, count, value):
+        """
+        push
+        Adds a counter to the heap
+        @param count Current count of the value
+        @param value Value counted
+        """
+        self.insertions += 1
+        heapq.heappush(self.heap, (count, self.insertions, value))
+
+    def popMinimum(self):
+        """
+        popMinimum
+        Removes the counter with the smallest count from the heap,
+        entries whose count has grown since they were pushed are refreshed
+        @return (count, value) of the smallest counter
+        """
+        while True:
+            count, insertion, value = heapq.heappop(self.heap)
+            current = self.counts[value]
+            if current == count:
+                return count, value
+            self.push(current, value)
+
+    def topValues(self):
+        """
+        topValues
+        Counts are reported as their guaranteed part (count - error),
+        the true count lies between this and this plus the error
+        @return List of (value, count) sorted by decreasing count
+        """
+        guaranteed = [(value, count - self.errors[value])
+                      for value, count in self.counts.items()]
+        return sorted(guaranteed, key=itemgetter(1), reverse=True)
+
+class FS3HyperLogLog(object):
+    """
+    FS3HyperLogLog
+    HyperLogLog estimate of the number of distinct values of a stream
+    Uses 2^precision one byte registers, the relative standard error
+    is about 1.04 / sqrt(2^precision) (0.8% for the default precision)
+    """
+
+    def __init__(self, precision=14):
+        """
+        Variable definitions
+        @param precision Number of hash bits used to pick a register
+        """
+        self.precision = precision
+        self.registerCount = 1 << precision
+        self.registers = bytearray(self.registerCount)
+        self.rankBits = 64 - precision
+
+    def update(self, value):
+        """
+        update
+        Adds one value to the sketch
+        @param value Hashable value, None for NULL
+        """
+        hashed = mixHash(hash(value))
+        index = hashed >> self.rankBits
+        remainder = hashed & ((1 << self.rankBits) - 1)
+        rank = self.rankBits - remainder.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def estimate(self):
+        """
+        estimate
+        @return Estimated number of distinct values
+        """
+        registers = numpy.frombuffer(self.registers, dtype=numpy.uint8)
+        alpha = 0.7213 / (1 + 1.079 / self.registerCount)
+        harmonic = numpy.sum(numpy.ldexp(1.0, -registers.astype(numpy.int32)))
+        estimate = alpha * self.registerCount * self.registerCount / harmonic
+        zeros = int(numpy.count_nonzero(registers == 0))
+        if estimate <= 2.5 * self.registerCount and zeros > 0:
+            # Small range correction, linear counting
+            estimate = self.registerCount * math.log(self.registerCount / float(zeros))
+        return int(round(estimate))
+
+def mixHash(value):
+    """
+    mixHash
+    Spreads a python hash over 64 bits (splitmix64 finalizer),
+    small integers hash to themselves and would fill few registers
+    @param value Integer hash
+    @return 64 bit integer
+    """
+    value &= 0xFFFFFFFFFFFFFFFF
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF
+    return value ^ (value >> 31)
+
+def combineValues(values):
+    """
+    combineValues
+    Formats the values of several fields of one row as a single entry
+    @param values Values of the selected fields for one feature
+    @return String of the form [value1] , [value2]
+    """
+    strings = ['NULL' if value is None else str(value) for value in values]
+    return '[' + '] , ['.join(strings) + ']'
+
+def countValues(inputArray):
+    """
+    countValues
+    Counts the occurrences of every value in a single pass
+    @param inputArray Array of values (with likely/possible duplicates)
+    @return valueCounts Dictionary of values (None for NULL) to their
+                        occurrences, in order of first appearance
+    """
+    valueCounts = {}
+    for value in inputArray:
+        if value == NULL:
+            value = None
+        try:
+            valueCounts[value] = valueCounts.get(value, 0) + 1
+        except TypeError:
+            value = hashableValue(value)
+            valueCounts[value] = valueCounts.get(value, 0) + 1
+    return valueCounts
+
+def hashableValue(value):
+    """
+    hashableValue
+    QGIS list and map fields give python lists and dicts, which cannot be
+    counted or encoded as dictionary keys. They are keyed by their text,
+    which is also how the tables show them
+    @param value Attribute value
+    @return The value itself when it is hashable, its string otherwise
+    """
+    try:
+        hash(value)
+    except TypeError:
+        return str(value)
+    return value
+
+def columnKeys(columns):
+    """
+    columnKeys
+    @param columns List of FS3Column
+    @return Iterable of the value of every row, tuples for several
+            columns, None standing for NULL
+    """
+    if len(columns) == 1:
+        return columns[0].toList(None)
+    return zip(*[column.toList(None) for column in columns])
+
+def countColumns(columns):
+    """
+    countColumns
+    Counts the occurrences of every row of loaded columns
+    A single numeric column is counted with numpy
+    @param columns List of FS3Column
+    @return valueCounts Dictionary of values (None for NULL) to their
+                        occurrences, in order of first appearance
+    """
+    if len(columns) == 1 and columns[0].values.dtype.kind in 'iuf':
+        return countArray(columns[0].values, columns[0].valid)
+    valueCounts = {}
+    for key in columnKeys(columns):
+        valueCounts[key] = valueCounts.get(key, 0) + 1
+    return valueCounts
+
+def distinctCounts(valueArray, validMask):
+    """
+    distinctCounts
+    Counts the filled values of a numeric array with a single numpy.unique
+    @param valueArray Numpy array of values
+    @param validMask Numpy boolean array, False for the empty cells
+    @return (distinct, counts, firstPositions) numpy arrays, the sorted
+            distinct values, their occurrences and the row each first appears in
+    """
+    positions = numpy.flatnonzero(validMask)
+    distinct, firstIndexes, counts = numpy.unique(valueArray[positions],
+                                                  return_index=True,
+                                                  return_counts=True)
+    return distinct, counts, positions[firstIndexes]
+
+def countArray(valueArray, validMask, counted=None):
+    """
+    countArray
+    Counts the occurrences of every value of a numeric array
+    @param valueArray Numpy array of values
+    @param validMask Numpy boolean array, False for the empty cells
+    @param counted Optional result of distinctCounts for the same array
+    @return valueCounts Dictionary of values (None for NULL) to their
+                        occurrences, in order of first appearance
+    """
+    if counted is None:
+        counted = distinctCounts(valueArray, validMask)
+    distinct, counts, firstPositions = counted
+    values = distinct.tolist()
+    counts = counts.tolist()
+    firstPositions = firstPositions.tolist()
+    nullCount = len(validMask) - sum(counts)
+    if nullCount > 0:
+        values.append(None)
+        counts.append(nullCount)
+        firstPositions.append(int(numpy.argmin(validMask)))
+    order = numpy.argsort(firstPositions, kind='stable')
+    return {values[i]: counts[i] for i in order.tolist()}
+
+def topArrayValues(valueArray, validMask, topK, counted=None):
+    """
+    topArrayValues
+    Picks the most frequent values of a numeric array without building
+    a dictionary of every distinct value
+    @param valueArray Numpy array of values
+    @param validMask Numpy boolean array, False for the empty cells
+    @param topK Number of most frequent values to return
+    @param counted Optional result of distinctCounts for the same array
+    @return List of (value, count) sorted by decreasing count, ties in
+            order of first appearance, None standing for NULL
+    """
+    if counted is None:
+        counted = distinctCounts(valueArray, validMask)
+    distinct, counts, firstPositions = counted
+    order = numpy.lexsort((firstPositions, -counts))[:topK]
+    topValues = list(zip(distinct[order].tolist(), counts[order].tolist()))
+    nullCount = len(validMask) - int(counts.sum())
+    if nullCount > 0:
+        firstNull = int(numpy.argmin(validMask))
+        rank = 0
+        for i in order.tolist():
+            if counts[i] < nullCount or (counts[i] == nullCount and firstPositions[i] > firstNull):
+                break
+            rank += 1
+        topValues.insert(rank, (None, nullCount))
+    return topValues[:topK]
+
 def uniqueValues(inputArray):
     """
     uniqueValues
@@ -84,14 +521,11 @@ def uniqueValues(inputArray):
     @return valueList List of unique values from inputArray
     """
     valueList = []
-    for value in inputArray:
-        if value not in valueList:
-            if value == NULL and QCoreApplication.translate("FS3Uniqueness", "NULL (Empty)") not in valueList:
-                valueList.append(QCoreApplication.translate("FS3Uniqueness", "NULL (Empty)"))
-            elif value == NULL and QCoreApplication.translate("FS3Uniqueness", "NULL (Empty)") in valueList:
-                continue
-            else:
-                valueList.append(value)
+    for value in countValues(inputArray):
+        if value is None:
+            valueList.append(QCoreApplication.translate("FS3Uniqueness", "NULL (Empty)"))
+        else:
+            valueList.append(value)
     return valueList
 
 def uniqueNumberOccurances(inputArray, originalArray):
@@ -102,12 +536,13 @@ def uniqueNumberOccurances(inputArray, originalArray):
     @param originalArray Array of all values (with likely/possible duplicates)
     @return valueList List containing number of occurances in originalArray of each value in inputArray
     """
+    valueCounts = countValues(originalArray)
     valueList = []
     for value in inputArray:
         if value == QCoreApplication.translate("FS3Uniqueness", "NULL (Empty)"):
-            valueList.append(originalArray.count(None))
+            valueList.append(valueCounts.get(None, 0))
         else:
-            valueList.append(originalArray.count(value))
+            valueList.append(valueCounts.get(value, 0))
     return valueList
 
 def uniquePercent(inputArray, numItems):
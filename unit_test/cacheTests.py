@@ -0,0 +1,74 @@
+"""
+
+    cacheTests.py -- Handles testing of the column cache
+                  -- For more information see : https://github.com/andreasfoulk/FS3
+
+    Copyright (c) 2018 Orden Aitchedji, Mckenna Duzac, Andreas Foulk, Tanner Lee
+
+    This software may be modified and distributed under the terms
+    of the MIT license.  See the LICENSE file for details.
+
+"""
+
+#These imports are required for unit tests
+import unittest
+import numpy
+from fs3Cache import FS3ColumnCache, memorySize
+
+class ColumnCacheTests(unittest.TestCase):
+    """
+    ColumnCacheTests
+    Tests for the least recently used column cache
+    """
+
+    def setUp(self):
+        #Room for two columns of 100 float values
+        self.column = numpy.zeros(100)
+        self.cache = FS3ColumnCache(2 * memorySize(self.column))
+
+    def testLeastRecentlyUsedEvicted(self):
+        """
+        Used to test that the least recently used entry leaves first
+        """
+        self.cache.put(('layer', False, 'column', 'a'), self.column)
+        self.cache.put(('layer', False, 'column', 'b'), numpy.zeros(100))
+        self.cache.get(('layer', False, 'column', 'a'))
+        self.cache.put(('layer', False, 'column', 'c'), numpy.zeros(100))
+        self.assertIs(self.cache.get(('layer', False, 'column', 'a')), self.column)
+        self.assertIsNone(self.cache.get(('layer', False, 'column', 'b')))
+        self.assertEqual(len(self.cache), 2)
+
+    def testTooLarge(self):
+        """
+        Used to test that an entry larger than the budget is not kept
+        """
+        self.assertFalse(self.cache.put(('layer', False, 'column', 'a'), numpy.zeros(1000)))
+        self.assertEqual(len(self.cache), 0)
+
+    def testInvalidateLayer(self):
+        """
+        Used to test that only the entries of the changed layer are dropped
+        """
+        self.cache.put(('layer', True, 'column', 'a'), self.column)
+        self.cache.put(('other', False, 'column', 'a'), self.column)
+        self.cache.invalidateLayer('layer', False)
+        self.assertIsNotNone(self.cache.get(('layer', True, 'column', 'a')))
+        self.cache.invalidateLayer('layer')
+        self.assertIsNone(self.cache.get(('layer', True, 'column', 'a')))
+        self.assertIsNotNone(self.cache.get(('other', False, 'column', 'a')))
+
+    def testOutdatedGeneration(self):
+        """
+        Used to test that values loaded before an invalidation are refused
+        """
+        generation = self.cache.generation('layer')
+        self.cache.invalidateLayer('layer')
+        self.assertFalse(self.cache.put(('layer', False, 'column', 'a'), self.column, generation))
+        self.assertTrue(self.cache.put(('layer', False, 'column', 'a'), self.column,
+                                       self.cache.generation('layer')))
+
+def main():
+    unittest.main()
+
+if __name__ == '__main__':
+    main()
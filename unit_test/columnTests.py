@@ -0,0 +1,198 @@
+"""
+
+    columnTests.py -- Handles testing for the columnar attribute data.
+                   -- For more information see : https://github.com/andreasfoulk/FS3
+    
+    Copyright (c) 2018 Orden Aitchedji, Mckenna Duzac, Andreas Foulk, Tanner Lee
+
+    This software may be modified and distributed under the terms
+    of the MIT license.  See the LICENSE file for details.
+
+"""
+
+#These imports are required for unit tests
+import unittest
+import numpy
+from fs3Columns import FS3Column, FS3EncodedColumn, sortOrder
+
+class TestField(object):
+    """
+    TestField
+    Stands in for the name and type of a QgsField
+    """
+
+    def __init__(self, name, numeric):
+        self.fieldName = name
+        self.numericField = numeric
+
+    def name(self):
+        return self.fieldName
+
+    def isNumeric(self):
+        return self.numericField
+
+class ColumnTests(unittest.TestCase):
+    """
+    ColumnTests
+    Tests for the typed columns and their validity masks
+    """
+
+    @classmethod
+    def setUpClass(self):
+        #Integers with empty values
+        self.integers = FS3Column(TestField('count', True), [3, None, 7, 1])
+
+        #Decimals without empty values
+        self.decimals = FS3Column(TestField('area', True), [1.5, 2, 0.25])
+
+        #Text with empty values
+        self.text = FS3Column(TestField('name', False), ['a', None, 'bc'])
+
+    def testNumericTypes(self):
+        """
+        Used to test that numeric columns get a typed array
+        """
+        self.assertEqual(self.integers.values.dtype.kind, 'i')
+        self.assertEqual(self.decimals.values.dtype.kind, 'f')
+        self.assertEqual(self.integers.values.tolist(), [3, 0, 7, 1])
+
+    def testValidity(self):
+        """
+        Used to test the validity masks
+        """
+        self.assertEqual(self.integers.valid.tolist(), [True, False, True, True])
+        self.assertTrue(self.decimals.valid.all())
+        self.assertEqual(self.text.valid.tolist(), [True, False, True])
+
+    def testToList(self):
+        """
+        Used to test that empty cells come back as NULL
+        """
+        self.assertEqual(self.integers.toList(), [3, None, 7, 1])
+        self.assertEqual(self.text.toList(), ['a', None, 'bc'])
+        self.assertEqual(len(self.text), 3)
+
+    def testAccumulator(self):
+        """
+        Used to test the moments carried by numeric columns
+        """
+        self.assertEqual(self.integers.accumulator.count, 3)
+        self.assertEqual(self.integers.accumulator.nullCount, 1)
+        self.assertEqual(self.integers.accumulator.sumValue, 11)
+        self.assertIsNone(self.text.accumulator)
+
+    def testConcatenate(self):
+        """
+        Used to test that chunks read one after the other join in order
+        """
+        field = TestField('count', True)
+        column = FS3Column.concatenate([FS3Column(field, [3, None]),
+                                        FS3Column(field, [7, 1])])
+        self.assertEqual(column.toList(), self.integers.toList())
+        self.assertEqual(column.accumulator.count, 3)
+        self.assertEqual(column.accumulator.nullCount, 1)
+        self.assertEqual(column.accumulator.sumValue, 11)
+        self.assertAlmostEqual(column.accumulator.varianceValue(),
+                               self.integers.accumulator.varianceValue())
+
+    def testListValues(self):
+        """
+        Used to test that list and map values are keyed by their text
+        """
+        column = FS3Column(TestField('tags', False), [[1, 2], None, [1, 2], {'a': 1}])
+        self.assertEqual(column.toList(), ['[1, 2]', None, '[1, 2]', "{'a': 1}"])
+        encoded = FS3EncodedColumn(column.toList(None))
+        self.assertEqual(encoded.valueCounts(), {'[1, 2]': 2, None: 1, "{'a': 1}": 1})
+        encoded = FS3EncodedColumn([[1, 2], None, [1, 2]])
+        self.assertEqual(encoded.dictionary, ['[1, 2]'])
+
+class EncodedColumnTests(unittest.TestCase):
+    """
+    EncodedColumnTests
+    Tests for the dictionary encoded text columns
+    """
+
+    @classmethod
+    def setUpClass(self):
+        #Land use classes with empty values
+        self.landUse = FS3EncodedColumn(['forest', 'urban', None, 'forest',
+                                         'water', 'urban', None, 'forest'])
+
+        #A column with only empty values
+        self.emptyColumn = FS3EncodedColumn([None, None])
+
+    def testDictionarySorted(self):
+        """
+        Used to test that the codes follow the order of the strings
+        """
+        self.assertEqual(self.landUse.dictionary, ['forest', 'urban', 'water'])
+        self.assertEqual(self.landUse.codes.tolist(), [0, 1, -1, 0, 2, 1, -1, 0])
+
+    def testCounts(self):
+        """
+        Used to test the occurrences in order of first appearance
+        """
+        self.assertEqual(self.landUse.nullCount, 2)
+        self.assertEqual(list(self.landUse.valueCounts().items()),
+                         [('forest', 3), ('urban', 2), (None, 2), ('water', 1)])
+        self.assertEqual(self.landUse.distinctCount(), 4)
+
+    def testLengthCounts(self):
+        """
+        Used to test the string length histogram
+        """
+        self.assertEqual(self.landUse.lengthCounts(), {5: 3, 6: 3})
+
+    def testEmptyColumn(self):
+        """
+        Used to test a column without filled values
+        """
+        self.assertEqual(self.emptyColumn.codes.tolist(), [-1, -1])
+        self.assertEqual(self.emptyColumn.valueCounts(), {None: 2})
+        self.assertEqual(self.emptyColumn.lengthCounts(), {})
+        self.assertEqual(self.emptyColumn.distinctCount(), 1)
+
+    def testMixedTypes(self):
+        """
+        Used to test the order of a column mixing numbers and text
+        """
+        mixedColumn = FS3EncodedColumn(['b', 2, None, 'a', 1.5])
+        self.assertEqual(mixedColumn.dictionary, [1.5, 2, 'a', 'b'])
+
+    def testNumericTextSortCodes(self):
+        """
+        Used to test that text reading as a number sorts numerically first
+        """
+        numericText = FS3EncodedColumn(['10', 'b', '9', None, '-1.5', 'a'])
+        self.assertEqual(numericText.sortCodes().tolist(), [2, 4, 1, -1, 0, 3])
+        self.assertEqual(self.landUse.sortCodes().tolist(),
+                         self.landUse.codes.tolist())
+        self.assertEqual(self.emptyColumn.sortCodes().tolist(), [-1, -1])
+
+class SortOrderTests(unittest.TestCase):
+    """
+    SortOrderTests
+    Tests for the row order of a sorted column
+    """
+
+    def testAscending(self):
+        """
+        Used to test that ties keep their order and empty cells come last
+        """
+        keys = numpy.array([3, 1, 0, 1, 2])
+        valid = numpy.array([True, True, False, True, True])
+        self.assertEqual(sortOrder(keys, valid).tolist(), [1, 3, 4, 0, 2])
+
+    def testDescending(self):
+        """
+        Used to test that empty cells also come last when descending
+        """
+        keys = numpy.array([3.5, 1.0, 0.0, 1.0, 2.0])
+        valid = numpy.array([True, True, False, True, True])
+        self.assertEqual(sortOrder(keys, valid, True).tolist(), [0, 4, 1, 3, 2])
+
+def main():
+    unittest.main()
+
+if __name__ == '__main__':
+    main()
@@ -21,9 +21,11 @@ TODO:
 
 #These imports are required for unit tests
 import unittest
+import numpy
 
 from fs3Stats import FS3CharacterStatistics, FS3NumericalStatistics
-from fs3Stats import removeEmptyCells
+from fs3Stats import removeEmptyCells, FS3StatisticsAccumulator, FS3QuantileSketch
+from fs3Stats import FS3SortedColumn
 
 class NumericStatTests(unittest.TestCase):
     """
@@ -282,7 +284,7 @@ class NumericStatTests(unittest.TestCase):
         """
         expected = 185003.57142857142
         actual = self.variedValues.coeffVarValue
-        self.assertEqual(actual, expected)
+        self.assertAlmostEqual(actual, expected)
 
     def testPercentilesVariedValues(self):
         """
@@ -476,6 +478,162 @@ class CharacterStatTests(unittest.TestCase):
         actual = self.emptyValues.percentiles
         self.assertEqual(actual, expected)
 
+class AccumulatorTests(unittest.TestCase):
+    """
+    AccumulatorTests
+    Contains test cases for the moment statistics accumulator
+    """
+
+    @classmethod
+    def setUpClass(self):
+        #The filled values of [9, 20, 36, None, 4, None, 18, 12]
+        self.accumulator = FS3StatisticsAccumulator.fromArray(numpy.array([9, 20, 36, 4, 18, 12]))
+
+    def testCount(self):
+        """
+        Used to test the filled count
+        """
+        self.assertEqual(self.accumulator.count, 6)
+
+    def testMoments(self):
+        """
+        Used to test the moments against the batch results
+        """
+        self.assertEqual(self.accumulator.maxValue, 36)
+        self.assertEqual(self.accumulator.minValue, 4)
+        self.assertEqual(self.accumulator.sumValue, 99)
+        self.assertAlmostEqual(self.accumulator.meanValue, 16.5)
+        self.assertAlmostEqual(self.accumulator.varianceValue(), 125.5)
+
+    def testMomentsFromCounts(self):
+        """
+        Used to test that a histogram gives the same moments
+        """
+        counted = FS3StatisticsAccumulator.fromCounts({9: 1, 20: 1, 36: 1, 4: 1, 18: 1, 12: 1})
+        self.assertEqual(counted.count, self.accumulator.count)
+        self.assertEqual(counted.sumValue, self.accumulator.sumValue)
+        self.assertAlmostEqual(counted.varianceValue(), self.accumulator.varianceValue())
+        repeated = FS3StatisticsAccumulator.fromCounts({2: 3, 5: 1})
+        self.assertEqual(repeated.count, 4)
+        self.assertEqual(repeated.sumValue, 11)
+        self.assertAlmostEqual(repeated.varianceValue(), 2.25)
+
+    def testLargeIntegers(self):
+        """
+        Used to test that integer sums do not overflow int64
+        """
+        accumulator = FS3StatisticsAccumulator.fromArray(numpy.array([4 * 10 ** 18] * 3))
+        self.assertEqual(accumulator.sumValue, 12 * 10 ** 18)
+        self.assertAlmostEqual(accumulator.meanValue, 4e18)
+
+    def testUpdateInChunks(self):
+        """
+        Used to test that chunks fed one after the other match the batch results
+        """
+        accumulator = FS3StatisticsAccumulator()
+        accumulator.update(numpy.array([9, 20]), 0)
+        accumulator.update(numpy.array([36]), 1)
+        accumulator.update(numpy.array([4, 18, 12]), 1)
+        self.assertEqual(accumulator.count, self.accumulator.count)
+        self.assertEqual(accumulator.nullCount, 2)
+        self.assertEqual(accumulator.maxValue, 36)
+        self.assertEqual(accumulator.minValue, 4)
+        self.assertEqual(accumulator.sumValue, 99)
+        self.assertAlmostEqual(accumulator.meanValue, 16.5)
+        self.assertAlmostEqual(accumulator.varianceValue(), 125.5)
+
+    def testMerge(self):
+        """
+        Used to test that the states of separate chunks combine
+        """
+        first = FS3StatisticsAccumulator.fromArray(numpy.array([9, 20, 36]), nullCount=1)
+        second = FS3StatisticsAccumulator.fromArray(numpy.array([4, 18, 12]), nullCount=1)
+        merged = FS3StatisticsAccumulator().merge(first).merge(second)
+        self.assertEqual(merged.count, 6)
+        self.assertEqual(merged.nullCount, 2)
+        self.assertEqual(merged.sumValue, 99)
+        self.assertAlmostEqual(merged.varianceValue(), self.accumulator.varianceValue())
+        empty = FS3StatisticsAccumulator.fromArray(numpy.array([]))
+        self.assertEqual(first.merge(empty).count, 3)
+
+class QuantileSketchTests(unittest.TestCase):
+    """
+    QuantileSketchTests
+    Contains test cases for the approximate percentile sketch
+    """
+
+    def testSmallSketchIsExact(self):
+        """
+        Used to test that an uncompacted sketch matches the exact percentiles
+        """
+        sketch = FS3QuantileSketch()
+        sketch.extend([1, 4, 8, 3, 6])
+        self.assertEqual(sketch.percentiles([25, 50, 75]), [3.0, 4.0, 6.0])
+        self.assertEqual(sketch.rankError(), 0)
+
+    def testLargeSketchIsBounded(self):
+        """
+        Used to test memory and rank error on several batches of values
+        """
+        sketch = FS3QuantileSketch()
+        sketch.extend(numpy.random.RandomState(0).permutation(300000))
+        self.assertEqual(sketch.count, 300000)
+        self.assertLess(sketch.size, sketch.maxSize)
+        for items in sketch.compactors[1:]:
+            self.assertTrue((numpy.diff(items) >= 0).all())
+        for percentile in [10, 50, 90]:
+            estimate = sketch.percentiles([percentile])[0]
+            self.assertLess(abs(estimate / 300000 - percentile / 100), sketch.rankError())
+
+    def testMerge(self):
+        """
+        Used to test that sketches of separate chunks combine
+        """
+        values = numpy.random.RandomState(1).permutation(300000)
+        sketch = FS3QuantileSketch()
+        for start in range(0, len(values), 100000):
+            chunk = FS3QuantileSketch()
+            chunk.extend(values[start:start + 100000])
+            sketch.merge(chunk)
+        self.assertEqual(sketch.count, 300000)
+        self.assertLess(sketch.size, sketch.maxSize)
+        for items in sketch.compactors[1:]:
+            self.assertTrue((numpy.diff(items) >= 0).all())
+        for percentile in [10, 50, 90]:
+            estimate = sketch.percentiles([percentile])[0]
+            self.assertLess(abs(estimate / 300000 - percentile / 100), sketch.rankError())
+
+class SortedColumnTests(unittest.TestCase):
+    """
+    SortedColumnTests
+    Contains test cases for the cached sorted column
+    """
+
+    @classmethod
+    def setUpClass(self):
+        self.column = FS3SortedColumn(numpy.array([9, 20, 36, 4, 18, 12, 12]))
+
+    def testMedianAndMode(self):
+        """
+        Used to test the values read while building the column
+        """
+        self.assertEqual(self.column.medianValue, 12)
+        self.assertEqual(self.column.modeValue, 12)
+
+    def testPercentileSets(self):
+        """
+        Used to test that different percentile sets reuse the same column
+        """
+        self.assertEqual(self.column.percentiles([25, 50, 75]), [10.5, 12.0, 19.0])
+        self.assertEqual(self.column.percentiles([50, 80, 95]), [12.0, 19.6, 31.19999999999999])
+
+    def testLargeIntegerMedian(self):
+        """
+        Used to test that averaging the middle values does not overflow int64
+        """
+        column = FS3SortedColumn(numpy.array([9 * 10 ** 18, 4 * 10 ** 18]))
+        self.assertEqual(column.medianValue, 6.5e18)
+
 
 def sMain():
     unittest.main()
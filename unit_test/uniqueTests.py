@@ -16,7 +16,9 @@ TODO:
 
 #These imports are required for unit tests
 import unittest
-from fs3Unique import FS3Uniqueness
+import numpy
+from fs3Unique import FS3Uniqueness, FS3SpaceSaving, FS3HyperLogLog, countValues, countArray
+from fs3Unique import distinctCounts, topArrayValues
 
 class UniqueValueTests(unittest.TestCase):
     """
@@ -106,6 +108,114 @@ class UniqueValueTests(unittest.TestCase):
         actual = self.charValues.uniquePercent
         self.assertEqual(actual, expected)
 
+class CountValuesTests(unittest.TestCase):
+    """
+    CountValuesTests
+    Tests for the single pass value counting
+    """
+
+    def testCountOrder(self):
+        expected = {'cat': 2, 'dog': 1, None: 1, 'bird': 1}
+        actual = countValues(['cat', 'dog', None, 'cat', 'bird'])
+        self.assertEqual(actual, expected)
+        self.assertEqual(list(actual), ['cat', 'dog', None, 'bird'])
+
+    def testMultiFieldKeys(self):
+        multiValues = FS3Uniqueness()
+        multiValues.initialize([[1, 2, None, 1], ['a', 'b', None, 'a']])
+        self.assertEqual(multiValues.uniqueValues, [(1, 'a'), (2, 'b'), (None, None)])
+        self.assertEqual(multiValues.uniqueNumOccur, [2, 1, 1])
+        self.assertEqual(multiValues.displayValues(),
+                         ['[1] , [a]', '[2] , [b]', '[NULL] , [NULL]'])
+
+    def testCountListValues(self):
+        expected = {'[1, 2]': 2, None: 1, "{'a': 1}": 1}
+        actual = countValues([[1, 2], None, [1, 2], {'a': 1}])
+        self.assertEqual(actual, expected)
+
+    def testCountEmpty(self):
+        expected = {}
+        actual = countValues([])
+        self.assertEqual(actual, expected)
+
+    def testCountArray(self):
+        values = numpy.array([2.5, 1.0, 0.0, 2.5, 7.0])
+        valid = numpy.array([True, True, False, True, True])
+        actual = countArray(values, valid)
+        self.assertEqual(actual, {2.5: 2, 1.0: 1, None: 1, 7.0: 1})
+        self.assertEqual(list(actual), [2.5, 1.0, None, 7.0])
+        distinct, counts, firstPositions = distinctCounts(values, valid)
+        self.assertEqual(counts.tolist(), [1, 2, 1])
+        self.assertEqual(list(countArray(values, valid, (distinct, counts, firstPositions))),
+                         list(actual))
+
+    def testTopArrayValues(self):
+        values = numpy.array([3, 0, 3, 5, 0, 0, 5, 3, 9])
+        valid = numpy.array([True, False, True, True, False, True, True, True, True])
+        self.assertEqual(topArrayValues(values, valid, 3), [(3, 3), (None, 2), (5, 2)])
+        self.assertEqual(topArrayValues(values, valid, 1), [(3, 3)])
+
+class SpaceSavingTests(unittest.TestCase):
+    """
+    SpaceSavingTests
+    Tests for the fixed memory top-K unique values
+    """
+
+    @classmethod
+    def setUpClass(self):
+        #Two heavy hitters hidden in a long tail of distinct values
+        self.values = []
+        for i in range(1000):
+            self.values.extend(['cat', 'dog', 'cat', i])
+        self.summary = FS3SpaceSaving(10)
+        for value in self.values:
+            self.summary.update(value)
+        self.topValues = FS3Uniqueness()
+        self.topValues.initialize([self.values], topK=10)
+
+    def testSummaryIsBounded(self):
+        self.assertEqual(len(self.summary.counts), 10)
+        self.assertEqual(len(self.summary.heap), 10)
+
+    def testHeavyHittersKept(self):
+        counts = dict(self.summary.topValues())
+        for value, expected in [('cat', 2000), ('dog', 1000)]:
+            self.assertLessEqual(counts[value], expected)
+            self.assertLessEqual(expected, counts[value] + self.summary.errors[value])
+
+    def testOtherBucket(self):
+        self.assertEqual(self.topValues.uniqueValues[:2], ['cat', 'dog'])
+        self.assertEqual(sum(self.topValues.uniqueNumOccur), len(self.values))
+        self.assertEqual(self.topValues.statCount, 4)
+        self.assertEqual(self.topValues.displayErrors()[-1], '')
+
+    def testFromCounts(self):
+        summary = FS3SpaceSaving.fromCounts(2, {'cat': 5, 'dog': 3, 'bird': 1})
+        self.assertEqual(summary.total, 9)
+        self.assertEqual(summary.topValues(), [('cat', 5), ('dog', 3)])
+        summary.update('fish')
+        self.assertEqual(summary.counts['fish'], 4)
+        self.assertEqual(summary.errors['fish'], 3)
+
+class HyperLogLogTests(unittest.TestCase):
+    """
+    HyperLogLogTests
+    Tests for the distinct value estimate
+    """
+
+    def testSmallCountIsExact(self):
+        sketch = FS3HyperLogLog()
+        for value in [1, 2, 1, None, 'cat', (1, 'cat'), 'cat']:
+            sketch.update(value)
+        self.assertEqual(sketch.estimate(), 5)
+
+    def testLargeCountWithinError(self):
+        sketch = FS3HyperLogLog()
+        for value in range(100000):
+            sketch.update(value)
+            sketch.update(value + 50000)
+        self.assertAlmostEqual(sketch.estimate() / 150000.0, 1, delta=0.03)
+
 
 def main():
     unittest.main()